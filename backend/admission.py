@@ -0,0 +1,280 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+from flask import jsonify
+
+from metrics import register_gauge
+
+logger = logging.getLogger(__name__)
+
+# Per-process admission control for CPU-heavy routes. Only meaningful when a
+# worker serves requests concurrently (gunicorn gthread, or the async mode's
+# passthrough pool); with one sync thread per worker there is nothing to shed.
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true').lower() in ('1', 'true', 'yes')
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+# Class-wide defaults. `concurrency` caps in-flight requests across every route
+# of the class; per-route limits (decorator kwargs) can only be tighter. Batch
+# traffic never occupies interactive capacity, and vice versa.
+PRIORITY_CLASSES = {
+    INTERACTIVE: {
+        'concurrency': int(os.getenv('ADMISSION_INTERACTIVE_CONCURRENCY', 16)),
+        'queue': int(os.getenv('ADMISSION_INTERACTIVE_QUEUE', 32)),
+        'deadline': float(os.getenv('ADMISSION_INTERACTIVE_DEADLINE', 1.0)),
+    },
+    BATCH: {
+        'concurrency': int(os.getenv('ADMISSION_BATCH_CONCURRENCY', 2)),
+        'queue': int(os.getenv('ADMISSION_BATCH_QUEUE', 8)),
+        'deadline': float(os.getenv('ADMISSION_BATCH_DEADLINE', 10.0)),
+    },
+}
+
+# Request threads per worker. Every queued request parks one of them, so the
+# batch class (running plus queued) is held to the thread count minus
+# ADMISSION_INTERACTIVE_RESERVE, keeping those threads free for interactive
+# routes. Under gunicorn the post_worker_init hook in gunicorn.conf.py passes
+# the worker's real thread count, and the async mode its passthrough pool
+# size; set this when serving any other way (or with another gunicorn config).
+ADMISSION_WORKER_THREADS = int(os.getenv('ADMISSION_WORKER_THREADS', 0))
+ADMISSION_INTERACTIVE_RESERVE = int(os.getenv('ADMISSION_INTERACTIVE_RESERVE', 1))
+# Batch requests are CPU-bound; running more than there are cores only splits
+# the CPU (and the GIL) with the interactive requests
+ADMISSION_BATCH_CPUS = int(os.getenv('ADMISSION_BATCH_CPUS', os.cpu_count() or 1))
+
+# Weight of the newest sample in the per-route service time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+def class_limits(threads):
+    """
+    Effective per-class `concurrency` and class-wide `waiting` caps for a
+    worker with `threads` request threads. Interactive keeps its configured
+    limits; batch gets at most threads - ADMISSION_INTERACTIVE_RESERVE
+    threads (never less than one running request), queue included, and
+    runs at most ADMISSION_BATCH_CPUS requests at once. With `threads`
+    unknown (None), classes keep their configured concurrency and only the
+    per-route queues bound the waiters.
+    """
+    limits = {}
+    for name, cfg in PRIORITY_CLASSES.items():
+        if threads is None:
+            limits[name] = {'concurrency': cfg['concurrency'], 'waiting': None}
+            continue
+        if name == INTERACTIVE:
+            limits[name] = {'concurrency': cfg['concurrency'], 'waiting': cfg['queue']}
+            continue
+        budget = max(1, threads - ADMISSION_INTERACTIVE_RESERVE)
+        concurrency = min(cfg['concurrency'], budget, max(1, ADMISSION_BATCH_CPUS))
+        limits[name] = {'concurrency': concurrency, 'waiting': min(cfg['queue'], budget - concurrency)}
+    return limits
+
+
+_cond = threading.Condition()
+_class_in_flight = {name: 0 for name in PRIORITY_CLASSES}
+_class_waiting = {name: 0 for name in PRIORITY_CLASSES}
+_worker_threads = ADMISSION_WORKER_THREADS or None
+_class_limits = class_limits(_worker_threads)
+_limiters = {}   # route name -> RouteLimiter
+_warned_unsized = False
+
+
+def set_worker_threads(threads):
+    """Size the class limits for `threads` request threads (ADMISSION_WORKER_THREADS wins if set)."""
+    global _worker_threads, _class_limits
+    with _cond:
+        _worker_threads = ADMISSION_WORKER_THREADS or max(1, int(threads))
+        _class_limits = class_limits(_worker_threads)
+        limits = _class_limits
+        _cond.notify_all()
+    logger.info(f"Admission control sized for {_worker_threads} request thread(s): {limits}")
+
+
+def _warn_unsized():
+    # Once per process, the first time a request has to queue
+    global _warned_unsized
+    if not _warned_unsized:
+        _warned_unsized = True
+        logger.warning("Admission control does not know this worker's thread count (no gunicorn "
+                       "post_worker_init hook ran and ADMISSION_WORKER_THREADS is unset); batch waiters "
+                       "are not capped by threads and can starve interactive routes")
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteLimiter:
+    """
+    Bounded FIFO in front of one route. A request is admitted when the route
+    and its priority class both have a free slot and it is first in line.
+    It is rejected up front when the route's queue or its class's waiter
+    cap is full or the estimated wait already exceeds the deadline, and
+    dropped if the deadline passes while queued. All state is guarded by
+    the module-level condition.
+    """
+
+    def __init__(self, name, priority, max_concurrent, max_queue, deadline):
+        self.name = name
+        self.priority = priority
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.in_flight = 0
+        self.waiting = deque()
+        self.service_time = None
+        self.admitted = 0
+        self.rejected = {'queue_full': 0, 'class_queue_full': 0, 'deadline': 0, 'timeout': 0}
+
+    def _capacity(self):
+        return min(self.max_concurrent, _class_limits[self.priority]['concurrency'])
+
+    def _can_run(self, ticket):
+        return (self.in_flight < self.max_concurrent
+                and _class_in_flight[self.priority] < _class_limits[self.priority]['concurrency']
+                and (not self.waiting or self.waiting[0] is ticket))
+
+    def estimated_wait(self, position):
+        if self.service_time is None:
+            return 0.0
+        return math.ceil(position / max(1, self._capacity())) * self.service_time
+
+    def _reject(self, reason, wait):
+        self.rejected[reason] += 1
+        raise Rejected(reason, max(1, math.ceil(wait or self.deadline)))
+
+    def acquire(self):
+        with _cond:
+            if self._can_run(None):
+                self._admit()
+                return
+            if len(self.waiting) >= self.max_queue:
+                self._reject('queue_full', self.estimated_wait(len(self.waiting) + 1))
+            class_cap = _class_limits[self.priority]['waiting']
+            if class_cap is None:
+                _warn_unsized()
+            elif _class_waiting[self.priority] >= class_cap:
+                self._reject('class_queue_full', self.estimated_wait(len(self.waiting) + 1))
+            wait = self.estimated_wait(len(self.waiting) + 1)
+            if wait > self.deadline:
+                self._reject('deadline', wait)
+
+            ticket = object()
+            self.waiting.append(ticket)
+            _class_waiting[self.priority] += 1
+            expires = time.monotonic() + self.deadline
+            try:
+                while not self._can_run(ticket):
+                    remaining = expires - time.monotonic()
+                    if remaining <= 0:
+                        self._reject('timeout', self.estimated_wait(len(self.waiting)))
+                    _cond.wait(remaining)
+            finally:
+                self.waiting.remove(ticket)
+                _class_waiting[self.priority] -= 1
+                _cond.notify_all()
+            self._admit()
+
+    def _admit(self):
+        self.in_flight += 1
+        _class_in_flight[self.priority] += 1
+        self.admitted += 1
+
+    def release(self, seconds):
+        with _cond:
+            self.in_flight -= 1
+            _class_in_flight[self.priority] -= 1
+            if self.service_time is None:
+                self.service_time = seconds
+            else:
+                self.service_time += SERVICE_TIME_ALPHA * (seconds - self.service_time)
+            _cond.notify_all()
+
+
+def admission_control(priority, max_concurrent=None, max_queue=None, deadline=None):
+    """
+    Put a route behind a RouteLimiter. Rejected requests get 503 with a
+    Retry-After derived from the route's observed service time.
+
+        @bp.route('/api/run-anova', methods=['POST'])
+        @admission_control(BATCH)
+        def run_anova(): ...
+    """
+    defaults = PRIORITY_CLASSES[priority]
+
+    def decorator(view):
+        if not ADMISSION_CONTROL:
+            return view
+        name = f'{view.__module__}.{view.__name__}'
+        limiter = _limiters[name] = RouteLimiter(
+            name, priority,
+            defaults['concurrency'] if max_concurrent is None else max_concurrent,
+            defaults['queue'] if max_queue is None else max_queue,
+            defaults['deadline'] if deadline is None else deadline)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                limiter.acquire()
+            except Rejected as e:
+                logger.warning(f"Shedding {name} ({priority}): {e.reason}")
+                response = jsonify({'success': False, 'error': 'Server busy, retry later', 'retryAfter': e.retry_after})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+            start = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.release(time.perf_counter() - start)
+
+        return wrapper
+    return decorator
+
+
+def _route_gauge(field):
+    def callback():
+        with _cond:
+            return {(('route', n), ('priority', l.priority)): getattr(l, field) for n, l in _limiters.items()}
+    return callback
+
+
+def _queue_depth():
+    with _cond:
+        return {(('route', n), ('priority', l.priority)): len(l.waiting) for n, l in _limiters.items()}
+
+
+def _rejections():
+    with _cond:
+        return {
+            (('route', n), ('priority', l.priority), ('reason', reason)): count
+            for n, l in _limiters.items()
+            for reason, count in l.rejected.items()
+        }
+
+
+def _class_gauge():
+    with _cond:
+        return {
+            (('priority', name), ('limit', limit)): value
+            for name, limits in _class_limits.items()
+            for limit, value in limits.items()
+            if value is not None
+        }
+
+
+register_gauge('mindful_admission_queue_depth', 'Requests waiting for an admission slot.', _queue_depth)
+register_gauge('mindful_admission_in_flight', 'Requests holding an admission slot.', _route_gauge('in_flight'))
+register_gauge('mindful_admission_admitted_total', 'Requests admitted by admission control.',
+               _route_gauge('admitted'), metric_type='counter')
+register_gauge('mindful_admission_class_limit', 'Effective class-wide concurrency and waiter caps.', _class_gauge)
+register_gauge('mindful_admission_rejections_total', 'Requests shed with 503, by reason.',
+               _rejections, metric_type='counter')
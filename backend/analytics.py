@@ -0,0 +1,285 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from statistics import median
+import numpy as np
+from flask import Blueprint, current_app, request, jsonify
+from admission import BATCH, admission_control
+from anova import anova_results
+from concordance import ccc_config, ccc_results
+from metrics import stage
+from prediction import CategoryMoodPredictor, all_category_predictions
+from readiness import lazy_import, warm_all
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('analytics', __name__)
+
+SECTIONS = ['predictions', 'anova', 'ccc']
+# Categories the Node ANOVA and CCC controllers analyze; sleep is handled separately there.
+ANALYSIS_CATEGORIES = ['activity', 'social', 'health']
+# Timed runs of each path behind compareSeparate; medians are reported
+ANALYTICS_COMPARE_REPEATS = max(1, int(os.getenv('ANALYTICS_COMPARE_REPEATS', 5)))
+
+
+def _activity_names(rows):
+    # JS `log.activity || 'unknown'`: None, NaN and '' all fall back
+    if 'activity' not in rows.columns:
+        return ['unknown'] * len(rows)
+    return [str(a) if a and a == a else 'unknown' for a in rows['activity']]
+
+
+def numeric_column(rows, column):
+    pd = lazy_import('pandas')
+    if column not in rows.columns:
+        return np.full(len(rows), np.nan)
+    return pd.to_numeric(rows[column], errors='coerce').to_numpy(dtype=float)
+
+
+def signed_intensity(rows, valence_column, intensity_column, scale):
+    """Vectorized concordance._signed; NaN where the intensity is missing."""
+    if valence_column in rows.columns:
+        valence = rows[valence_column].astype(str).str.lower().to_numpy()
+    else:
+        valence = np.full(len(rows), '')
+    sign = np.select([valence == 'positive', valence == 'negative'], [1.0, -1.0], 0.0)
+    # + 0.0 turns -0.0 into 0.0, as JSON.stringify does on the Node side
+    return sign * numeric_column(rows, intensity_column) * scale + 0.0
+
+
+def mood_scores(before, after):
+    """Node's Math.round((after - before) / 5 * 100); NaN where an intensity is missing."""
+    # Math.round rounds halves up, unlike Python's round()
+    return np.floor((after - before) / 5 * 100 + 0.5)
+
+
+def anova_groups(frame):
+    """
+    {category: {activity: [moodScore, ...]}} as the Node ANOVA controller
+    builds it: non-sleep logs with both intensities, scored
+    Math.round((afterIntensity - beforeIntensity) / 5 * 100).
+    """
+    groups = {}
+    if 'category' not in frame.columns:
+        return groups
+    rows = frame[frame['category'].isin(ANALYSIS_CATEGORIES)]
+    before = numeric_column(rows, 'beforeIntensity')
+    after = numeric_column(rows, 'afterIntensity')
+    paired = ~np.isnan(before) & ~np.isnan(after)
+    scores = mood_scores(before[paired], after[paired]).astype(int)
+    rows = rows[paired]
+    for category, activity, score in zip(rows['category'], _activity_names(rows), scores):
+        groups.setdefault(category, {}).setdefault(activity, []).append(int(score))
+    return groups
+
+
+def ccc_pairs(frame, scale):
+    """
+    {category: {activity: {"before": [...], "after": [...]}}} as the Node
+    concordance controller builds it: non-sleep logs, unknown categories
+    counted as activity, and every activity listed even without a pair.
+    """
+    data = {category: {} for category in ANALYSIS_CATEGORIES}
+    if 'category' not in frame.columns:
+        return data
+    rows = frame[frame['category'] != 'sleep']
+    categories = rows['category'].where(rows['category'].isin(ANALYSIS_CATEGORIES), 'activity')
+    before = signed_intensity(rows, 'beforeValence', 'beforeIntensity', scale)
+    after = signed_intensity(rows, 'afterValence', 'afterIntensity', scale)
+    for category, activity, b, a in zip(categories, _activity_names(rows), before, after):
+        group = data[category].setdefault(activity, {'before': [], 'after': []})
+        if b == b and a == a:
+            group['before'].append(float(b))
+            group['after'].append(float(a))
+    return data
+
+
+def _within(frame, bounds):
+    if not bounds or frame.empty:
+        return frame
+    pd = lazy_import('pandas')
+    start, end = pd.to_datetime([bounds['start'], bounds['end']], utc=True)
+    ts = frame['timestamp']
+    ts = ts.dt.tz_convert('UTC') if ts.dt.tz is not None else ts.dt.tz_localize('UTC')
+    return frame[(ts >= start) & (ts < end)]
+
+
+@contextmanager
+def _stopwatch(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+
+@contextmanager
+def _timed(timings, name):
+    with stage(f'analytics.{name}'), _stopwatch(timings, name):
+        yield
+
+
+def _normalized(mood_logs, sections, bounds):
+    """The prediction frame and, when ANOVA or CCC is requested, its upload-ordered window."""
+    frame = CategoryMoodPredictor().build_mood_frame(mood_logs)
+    # ANOVA/CCC keep the upload order, as Node sends them
+    window = _within(frame.sort_index(), bounds) if 'anova' in sections or 'ccc' in sections else None
+    return frame, window
+
+
+def _analyze(mood_logs, frame, window, sections, cfg, timer):
+    """The requested sections from one normalized frame; timer(name) times each."""
+    result = {}
+    if 'predictions' in sections:
+        with timer('predictions'):
+            result['predictions'] = all_category_predictions(mood_logs, frame)
+    if 'anova' in sections:
+        with timer('anova'):
+            result['anova'] = anova_results(anova_groups(window))
+    if 'ccc' in sections:
+        with timer('ccc'):
+            result['ccc'] = {**ccc_results(ccc_pairs(window, cfg['scale']), cfg), 'thresholds': cfg}
+    return result
+
+
+def _round_trip(key, value):
+    json = current_app.json
+    return json.loads(json.dumps({key: value}))[key]
+
+
+def _combined_call(mood_logs, sections, bounds, cfg):
+    """Milliseconds for one /api/analytics/user computation from a fresh decode of the logs."""
+    timings = {}
+    with _stopwatch(timings, 'total'):
+        logs = _round_trip('mood_logs', mood_logs)
+        frame, window = _normalized(logs, sections, bounds)
+        _analyze(logs, frame, window, sections, cfg, lambda name: _stopwatch({}, name))
+    return timings['total']
+
+
+def _reshaped(mood_logs, bounds):
+    """The upload-ordered, range-filtered frame a standalone ANOVA or CCC input is built from."""
+    return _within(CategoryMoodPredictor().build_mood_frame(mood_logs).sort_index(), bounds)
+
+
+def _separate_calls(mood_logs, sections, bounds, cfg):
+    """
+    Milliseconds for the same work done as separate
+    /api/predict-mood-all-categories, /api/run-anova and /api/ccc/run calls.
+    Each call decodes its own copy of the logs, rebuilds the frame and its
+    request body from them, and then decodes that body, so nothing is
+    shared between calls. HTTP round trips are not included.
+    """
+    timings = {}
+    if 'predictions' in sections:
+        with _stopwatch(timings, 'predictions'):
+            all_category_predictions(_round_trip('mood_logs', mood_logs))
+    if 'anova' in sections:
+        with _stopwatch(timings, 'anova'):
+            groups = anova_groups(_reshaped(_round_trip('mood_logs', mood_logs), bounds))
+            anova_results(_round_trip('data', groups))
+    if 'ccc' in sections:
+        with _stopwatch(timings, 'ccc'):
+            pairs = ccc_pairs(_reshaped(_round_trip('mood_logs', mood_logs), bounds), cfg['scale'])
+            node_pairs = {
+                category: {act: [list(p) for p in zip(g['before'], g['after'])] for act, g in acts.items()}
+                for category, acts in pairs.items()
+            }
+            ccc_results(_round_trip('data', node_pairs), cfg)
+    timings['total'] = round(sum(timings.values()), 3)
+    return timings
+
+
+def _compare(mood_logs, sections, bounds, cfg):
+    """
+    One combined call against separate calls, as medians over
+    ANALYTICS_COMPARE_REPEATS runs of each. Every warm-up runs and both
+    paths go once untimed first, so first-use imports are charged to
+    neither; the timed runs alternate which path goes first.
+    """
+    warm_all()
+    _combined_call(mood_logs, sections, bounds, cfg)
+    _separate_calls(mood_logs, sections, bounds, cfg)
+    combined, separate = [], []
+    for i in range(ANALYTICS_COMPARE_REPEATS):
+        runs = [(combined, _combined_call), (separate, _separate_calls)]
+        for samples, call in runs if i % 2 == 0 else reversed(runs):
+            samples.append(call(mood_logs, sections, bounds, cfg))
+    combined_ms = round(median(combined), 3)
+    separate_ms = {name: round(median(run[name] for run in separate), 3) for name in separate[0]}
+    return {
+        'combinedMs': combined_ms,
+        'separateMs': separate_ms,
+        'savedMs': round(separate_ms['total'] - combined_ms, 3),
+        'roundTripsSaved': len(sections) - 1,
+        'repeats': ANALYTICS_COMPARE_REPEATS,
+    }
+
+
+@bp.route('/api/analytics/user', methods=['POST'])
+@admission_control(BATCH)
+def user_analytics():
+    """
+    Predictions, ANOVA and CCC for one user from a single log upload.
+
+    Body:
+    {
+      "mood_logs": [ ...logs with category, activity, timestamp, before/after
+                     valence, intensity and emotion... ],
+      "sections": ["predictions", "anova", "ccc"],       (optional, default all)
+      "range": { "start": "<iso>", "end": "<iso>" },      (optional ANOVA/CCC window)
+      "thresholds": { "pos": 10, "neg": -10, "minPairs": 1, "minCcc": 0.2, "scale": 20 },
+      "compareSeparate": false                            (adds a timing comparison, see _compare)
+    }
+
+    The logs are decoded and normalized once; predictions use the 4-week
+    window as /api/predict-mood-all-categories does, while ANOVA and CCC
+    inputs are derived the way the Node controllers build them.
+    """
+    started = time.perf_counter()
+    timings = {}
+    try:
+        with _timed(timings, 'decode'):
+            body = request.get_json(silent=True) or {}
+        mood_logs = body.get('mood_logs') or []
+        if not mood_logs:
+            return jsonify({'success': False, 'message': 'Mood logs are required'}), 400
+
+        sections = body.get('sections') or SECTIONS
+        if not isinstance(sections, list) or not all(isinstance(s, str) for s in sections):
+            return jsonify({
+                'success': False,
+                'message': f"sections must be a list of names from: {', '.join(SECTIONS)}"
+            }), 400
+        unknown = [s for s in sections if s not in SECTIONS]
+        if unknown:
+            return jsonify({
+                'success': False,
+                'message': f"Unknown sections: {', '.join(map(str, unknown))}. Choose from: {', '.join(SECTIONS)}"
+            }), 400
+        bounds = body.get('range')
+        if bounds is not None and not (isinstance(bounds, dict) and bounds.get('start') and bounds.get('end')):
+            return jsonify({'success': False, 'message': 'range needs both start and end'}), 400
+
+        try:
+            with _timed(timings, 'normalize'):
+                frame, window = _normalized(mood_logs, sections, bounds)
+        except (KeyError, ValueError, TypeError) as e:
+            return jsonify({'success': False, 'message': f'Invalid mood logs: {str(e)}'}), 400
+
+        cfg = ccc_config(body.get('thresholds'))
+        result = {'success': True, 'sections': sections}
+        result.update(_analyze(mood_logs, frame, window, sections, cfg, lambda name: _timed(timings, name)))
+
+        timings['total'] = round((time.perf_counter() - started) * 1000, 3)
+        result['timingsMs'] = timings
+
+        if body.get('compareSeparate'):
+            result['comparison'] = _compare(mood_logs, sections, bounds, cfg)
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Analytics API Error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'error': str(e)
+        }), 500
@@ -1,7 +1,9 @@
 import numpy as np
-from scipy.stats import f_oneway
 from flask import Blueprint, request, jsonify
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
+from admission import BATCH, admission_control
+from etags import conditional_on_body
+from metrics import stage
+from readiness import lazy_import, register_warmup
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,9 +11,11 @@ logger = logging.getLogger(__name__)
 bp = Blueprint('anova', __name__)
 
 def safe_number(val):
-    if isinstance(val, (float, np.floating)) and (np.isnan(val) or np.isinf(val)):
+    """Python float, or None for NaN/Inf, so results work with any JSON encoder."""
+    if val is None:
         return None
-    return val
+    val = float(val)
+    return None if np.isnan(val) or np.isinf(val) else val
 
 def compute_anova(original_groups):
     filtered_groups = {k: v for k, v in original_groups.items() if len(v) >= 2}
@@ -21,7 +25,8 @@ def compute_anova(original_groups):
     groups_values = list(filtered_groups.values())
 
     try:
-        F_value, p_value = f_oneway(*groups_values)
+        with stage('anova.f_oneway'):
+            F_value, p_value = lazy_import('scipy.stats').f_oneway(*groups_values)
     except Exception:
         F_value, p_value = float('nan'), float('nan')
 
@@ -42,7 +47,7 @@ def compute_anova(original_groups):
     tukey_results = []
     tukey_info = {
         "groupSizes": group_counts,
-        "groupVariances": {k: (float(np.var(v, ddof=1)) if len(v) > 1 else None) for k, v in filtered_groups.items()},
+        "groupVariances": {k: (safe_number(np.var(v, ddof=1)) if len(v) > 1 else None) for k, v in filtered_groups.items()},
         "ran": False,
         "error": None,
         "skippedReason": None
@@ -64,12 +69,14 @@ def compute_anova(original_groups):
         elif all(np.var(filtered_groups[g], ddof=1) == 0 for g in filtered_groups if len(filtered_groups[g]) > 1):
             tukey_info["skippedReason"] = "Zero variance in all groups"
         else:
-            tukey = pairwise_tukeyhsd(endog=np.array(data), groups=np.array(labels), alpha=0.05)
+            pairwise_tukeyhsd = lazy_import('statsmodels.stats.multicomp').pairwise_tukeyhsd
+            with stage('anova.tukeyhsd'):
+                tukey = pairwise_tukeyhsd(endog=np.array(data), groups=np.array(labels), alpha=0.05)
             for res in tukey.summary().data[1:]:
                 meandiff, padj, lower, upper, reject = res[2], res[3], res[4], res[5], res[6]
                 entry = {
-                    "group1": res[0],
-                    "group2": res[1],
+                    "group1": str(res[0]),
+                    "group2": str(res[1]),
                     "meandiff": safe_number(round(float(meandiff), 2)),
                     "p_adj": safe_number(round(float(padj), 4)),
                     "p-adj": safe_number(round(float(padj), 4)),
@@ -82,6 +89,7 @@ def compute_anova(original_groups):
     except Exception as e:
         tukey_info["error"] = str(e)
 
+    # Plain Python values out, whatever encoder or caller consumes them
     return {
         "F_value": safe_number(round(F_value, 4)) if F_value is not None else None,
         "p_value": safe_number(round(p_value, 6)) if p_value is not None else None,
@@ -93,17 +101,19 @@ def compute_anova(original_groups):
         "tukeyInfo": tukey_info
     }
 
-@bp.route('/api/run-anova', methods=['POST'])
-def run_anova():
-    body = request.get_json()
-    if "data" not in body:
-        return jsonify({"success": False, "error": "Missing data"}), 400
+def _warm_anova():
+    compute_anova({'walking': [20, 40, 60], 'reading': [0, -20, 20], 'gaming': [-40, -20, 0]})
+
 
-    categories = body["data"]
+register_warmup('anova', _warm_anova)
+
+def anova_results(categories):
+    """Response body of /api/run-anova for {category: {activity: [moodScore, ...]}}."""
     results = {}
 
     for category, groups in categories.items():
-        anova_output = compute_anova(groups)
+        with stage('anova.compute'):
+            anova_output = compute_anova(groups)
         if anova_output is None:
             results[category] = {
                 "success": False,
@@ -127,10 +137,20 @@ def run_anova():
         }
 
     if all(not v.get("success") for v in results.values()):
-        return jsonify({
+        return {
             "success": False,
             "message": "Logs are still insufficient to run a proper analysis. Come back later!",
             "results": results
-        })
+        }
+
+    return {"success": True, "results": results}
+
+@bp.route('/api/run-anova', methods=['POST'])
+@conditional_on_body('run-anova')
+@admission_control(BATCH)
+def run_anova():
+    body = request.get_json()
+    if "data" not in body:
+        return jsonify({"success": False, "error": "Missing data"}), 400
 
-    return jsonify({"success": True, "results": results})
\ No newline at end of file
+    return jsonify(anova_results(body["data"]))
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Async serving mode for the routes that wait on the Node API.
+
+    gunicorn async_prediction:app --worker-class aiohttp.GunicornWebWorker --bind 0.0.0.0:5001
+
+/api/predict-category-mood, /api/check-category-data and /api/debug-mood-data
+are served on the event loop. The Node fetch goes through one pooled client
+session per worker, and JSON decoding plus CategoryMoodPredictor work run in
+a thread pool, so one worker keeps hundreds of fetches in flight instead of
+blocking on each. Every other route is passed through to the Flask app on
+the same pool, so both serving modes expose the same API and response shapes.
+"""
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector
+from multidict import CIMultiDict
+
+import admission
+import etags
+from compression import COMPRESSION_MIN_SIZE
+from main import app as flask_app
+from metrics import observe_request, stage
+import prediction
+
+logger = logging.getLogger(__name__)
+
+NODE_API_POOL_SIZE = int(os.getenv('NODE_API_POOL_SIZE', 200))
+NODE_API_TIMEOUT = float(os.getenv('NODE_API_TIMEOUT', 30))
+# Also runs the passed-through Flask routes, so it keeps at least 4 threads:
+# with fewer, queued batch requests wait in the pool ahead of admission control
+ASYNC_CPU_WORKERS = int(os.getenv('ASYNC_CPU_WORKERS', max(4, min(8, os.cpu_count() or 4))))
+ASYNC_MAX_BODY_BYTES = int(os.getenv('ASYNC_MAX_BODY_BYTES', 32 * 1024 * 1024))
+
+NODE_SESSION = web.AppKey('node_session', ClientSession)
+CPU_POOL = web.AppKey('cpu_pool', ThreadPoolExecutor)
+
+# Headers the WSGI passthrough must not copy verbatim onto the aiohttp response
+_HOP_HEADERS = {'content-length', 'transfer-encoding', 'connection'}
+# Request encodings aiohttp has already decoded by the time request.read() returns
+_DECODED_ENCODINGS = {'gzip', 'x-gzip', 'deflate', 'br', 'zstd'}
+
+
+def json_response(body, status=200):
+    payload = flask_app.json.dumps_bytes(body)
+    response = web.Response(body=payload, status=status, content_type='application/json')
+    if len(payload) >= COMPRESSION_MIN_SIZE:
+        # Negotiated against Accept-Encoding when the response is prepared
+        response.enable_compression()
+    return response
+
+
+async def run_cpu(request, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app[CPU_POOL], fn, *args)
+
+
+async def fetch_mood_logs_raw(request, token):
+    """Raw response bytes from Node, or None if it did not answer 200."""
+    url, headers = prediction.mood_logs_request(token)
+    with stage('prediction.upstream_fetch'):
+        async with request.app[NODE_SESSION].get(url, headers=headers) as response:
+            if response.status != 200:
+                return None
+            return await response.read()
+
+
+def _decode_and_build(build_body, raw, *args):
+    with stage('prediction.upstream_json_decode'):
+        mood_logs = flask_app.json.loads(raw).get('logs', [])
+    return build_body(mood_logs, *args)
+
+
+def _tagged(response, etag):
+    response.headers['ETag'] = etags.header_value(etag)
+    response.headers['Cache-Control'] = etags.CACHE_CONTROL
+    return response
+
+
+async def _serve_upstream(request, build_body, *args, error_prefix='API Error', expose_error=False, etag_route=None):
+    try:
+        raw = await fetch_mood_logs_raw(request, request.headers.get('Authorization'))
+        if raw is None:
+            return json_response(prediction.UPSTREAM_ERROR, 500)
+        etag = None
+        if etag_route and etags.ETAGS:
+            # Same fingerprint as prediction.conditional_upstream, so tags carry across serving modes
+            etag = etags.fingerprint(etag_route, *args, raw)
+            outcome, payload = etags.resolve(etag_route, etag, request.headers.get('If-None-Match'))
+            if outcome == etags.NOT_MODIFIED:
+                return _tagged(web.Response(status=304), etag)
+            if outcome == etags.CACHE_HIT:
+                response = web.Response(body=payload, content_type='application/json')
+                if len(payload) >= COMPRESSION_MIN_SIZE:
+                    response.enable_compression()
+                return _tagged(response, etag)
+        body, status = await run_cpu(request, _decode_and_build, build_body, raw, *args)
+        response = json_response(body, status)
+        if etag is not None and status == 200:
+            etags.store(etag, response.body)
+            _tagged(response, etag)
+        return response
+    except Exception as e:
+        logger.error(f"{error_prefix}: {str(e)}")
+        body = {'success': False, 'message': 'Internal server error'}
+        if expose_error:
+            body['error'] = str(e)
+        return json_response(body, 500)
+
+
+async def get_category_prediction(request):
+    category = request.query.get('category')
+    error = prediction.auth_error(request.headers.get('Authorization')) or prediction.category_error(category)
+    if error:
+        return json_response(*error)
+    return await _serve_upstream(request, prediction.category_prediction_body, category,
+                                 etag_route='predict-category-mood')
+
+
+async def check_category_data(request):
+    error = prediction.auth_error(request.headers.get('Authorization'))
+    if error:
+        return json_response(*error)
+    return await _serve_upstream(request, prediction.category_availability_body, etag_route='check-category-data')
+
+
+async def debug_mood_data(request):
+    error = prediction.auth_error(request.headers.get('Authorization'))
+    if error:
+        return json_response(*error)
+    return await _serve_upstream(
+        request, prediction.debug_mood_body, error_prefix='Debug API Error', expose_error=True)
+
+
+def _call_wsgi(environ):
+    captured = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        captured['status'] = int(status.split(' ', 1)[0])
+        captured['headers'] = headers
+        return chunks.append
+
+    result = flask_app(environ, start_response)
+    try:
+        chunks.extend(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return captured['status'], captured['headers'], b''.join(chunks)
+
+
+async def wsgi_passthrough(request):
+    """Serve any other route with the Flask app, off the event loop."""
+    body = await request.read()
+    host, _, port = (request.host or 'localhost').partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.path,
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': host,
+        'SERVER_PORT': port or ('443' if request.secure else '80'),
+        'SERVER_PROTOCOL': f"HTTP/{request.version.major}.{request.version.minor}",
+        'REMOTE_ADDR': request.remote or '',
+        'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name in set(request.headers.keys()):
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+            environ[key] = ','.join(request.headers.getall(name))
+    if environ.get('HTTP_CONTENT_ENCODING', '').strip().lower() in _DECODED_ENCODINGS:
+        del environ['HTTP_CONTENT_ENCODING']
+
+    status, headers, payload = await run_cpu(request, _call_wsgi, environ)
+    response_headers = CIMultiDict((k, v) for k, v in headers if k.lower() not in _HOP_HEADERS)
+    return web.Response(body=payload, status=status, headers=response_headers)
+
+
+@web.middleware
+async def record_metrics(request, handler):
+    # Passthrough requests are recorded by the Flask app's own hooks.
+    if request.match_info.route.handler is wsgi_passthrough:
+        return await handler(request)
+    start = time.perf_counter()
+    response = await handler(request)
+    observe_request('prediction', request.match_info.route.resource.canonical, request.method,
+                    response.status, time.perf_counter() - start)
+    return response
+
+
+async def _resources(app):
+    app[NODE_SESSION] = ClientSession(
+        connector=TCPConnector(limit=NODE_API_POOL_SIZE),
+        timeout=ClientTimeout(total=NODE_API_TIMEOUT))
+    app[CPU_POOL] = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix='async-cpu')
+    # Passed-through Flask routes queue for admission on this pool's threads
+    admission.set_worker_threads(ASYNC_CPU_WORKERS)
+    if ASYNC_CPU_WORKERS <= admission.ADMISSION_INTERACTIVE_RESERVE:
+        logger.warning(f"ASYNC_CPU_WORKERS={ASYNC_CPU_WORKERS} leaves no thread beyond the interactive reserve; "
+                       f"batch requests can delay interactive ones")
+    yield
+    await app[NODE_SESSION].close()
+    app[CPU_POOL].shutdown(wait=False)
+
+
+def create_app():
+    app = web.Application(client_max_size=ASYNC_MAX_BODY_BYTES, middlewares=[record_metrics])
+    app.cleanup_ctx.append(_resources)
+    app.router.add_get('/api/predict-category-mood', get_category_prediction)
+    app.router.add_get('/api/check-category-data', check_category_data)
+    app.router.add_get('/api/debug-mood-data', debug_mood_data)
+    app.router.add_route('*', '/{tail:.*}', wsgi_passthrough)
+    return app
+
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get("PYTHON_PORT", 5001))
+    print(f"Starting Combined Python Services (async mode) on port {port}...")
+    web.run_app(app, port=port)
@@ -0,0 +1,343 @@
+"""
+Microbenchmarks for the analytics hot paths, with regression budgets.
+
+    python -m benchmarks.bench_hotpaths                      # run and compare against the baseline
+    python -m benchmarks.bench_hotpaths --tiers tiny,small   # quicker subset
+    python -m benchmarks.bench_hotpaths --filter anova       # benchmarks whose name contains "anova"
+    python -m benchmarks.bench_hotpaths --update-baseline    # accept the current numbers
+
+Calls prepare_category_data, compute_anova, analyze_category/_ccc and
+get_sentiment_score directly on seeded synthetic data, across size tiers
+from a handful of logs to hundreds of thousands, plus edge shapes (many
+small groups, one huge group, zero-variance groups). Each benchmark
+records the median and best wall time per call, and the peak traced
+allocation from a separate tracemalloc run.
+
+Results are compared against benchmarks/baseline_hotpaths.json. A benchmark
+regresses when its best time exceeds baseline x timeBudget (the best run is
+far less noisy than the median on a shared box), or its peak allocation
+exceeds baseline x memoryBudget. Budgets are stored per
+benchmark in the baseline file, so noisy ones can be given more room. The
+exit status is 1 on any regression. Timings are machine-specific:
+regenerate the baseline on the box that runs the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta, timezone, time as dtime
+
+from loadtest.synthetic import ACTIVITIES, synthetic_comments, synthetic_mood_logs
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_hotpaths.json')
+
+TIERS = {'tiny': 10, 'small': 300, 'medium': 3_000, 'large': 30_000, 'xl': 300_000}
+DEFAULT_TIME_BUDGET = 1.5
+DEFAULT_MEMORY_BUDGET = 1.25
+
+BENCHMARKS = {}   # name -> zero-arg setup returning the callable to time
+
+
+def benchmark(name, tiers=None):
+    """Register setup(size) once per tier, as `name[tier]`, or once as `name`."""
+    def decorator(setup):
+        if tiers is None:
+            BENCHMARKS[name] = setup
+        for tier in tiers or ():
+            BENCHMARKS[f'{name}[{tier}]'] = lambda size=TIERS[tier]: setup(size)
+        return setup
+    return decorator
+
+
+def _window_logs(n, seed=0):
+    # All logs fall in the 4 full weeks before this week, the window
+    # prepare_category_data predicts from, whatever weekday the suite runs on.
+    today = datetime.now(timezone.utc).date()
+    monday = datetime.combine(today - timedelta(days=today.weekday()), dtime.min, tzinfo=timezone.utc)
+    return synthetic_mood_logs(n, seed=seed, days=28, now=monday - timedelta(seconds=1))
+
+
+# --- prediction ---------------------------------------------------------------
+
+@benchmark('prediction.prepare_category_data', tiers=['tiny', 'small', 'medium', 'large', 'xl'])
+def _prepare_category_data(size):
+    from prediction import CategoryMoodPredictor
+    predictor, logs = CategoryMoodPredictor(), _window_logs(size)
+    return lambda: predictor.prepare_category_data(logs, 'activity')
+
+
+@benchmark('prediction.all_categories_shared_frame', tiers=['small', 'medium', 'large'])
+def _all_categories(size):
+    from prediction import all_category_predictions
+    logs = _window_logs(size)
+    return lambda: all_category_predictions(logs)
+
+
+@benchmark('prediction.availability_screen', tiers=['small', 'large', 'xl'])
+def _availability(size):
+    from prediction import CategoryMoodPredictor
+    predictor, logs = CategoryMoodPredictor(), _window_logs(size)
+    return lambda: predictor.check_category_data_availability(logs)
+
+
+@benchmark('prediction.prepare_category_data.single_weekday')
+def _single_weekday():
+    # Every log on one weekday: six empty days and one dense one
+    from prediction import CategoryMoodPredictor
+    logs = _window_logs(3_000)
+    for log in logs:
+        ts = datetime.fromisoformat(log['timestamp'].replace('Z', '+00:00'))
+        ts -= timedelta(days=ts.weekday())
+        log['timestamp'] = ts.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        log['category'] = 'activity'
+    predictor = CategoryMoodPredictor()
+    return lambda: predictor.prepare_category_data(logs, 'activity')
+
+
+# --- ANOVA --------------------------------------------------------------------
+
+def _scores(rnd, n, spread=60, shift=0):
+    return [max(-100, min(100, round(rnd.gauss(shift, spread)))) for _ in range(n)]
+
+
+@benchmark('anova.compute_anova', tiers=['tiny', 'small', 'medium', 'large', 'xl'])
+def _anova_typical(size):
+    from anova import compute_anova
+    rnd = random.Random(size)
+    activities = ACTIVITIES['activity']
+    groups = {a: _scores(rnd, max(2, size // len(activities)), shift=i * 5) for i, a in enumerate(activities)}
+    return lambda: compute_anova(groups)
+
+
+@benchmark('anova.compute_anova.many_small_groups', tiers=['small', 'medium'])
+def _anova_many_small(size):
+    from anova import compute_anova
+    rnd = random.Random(size)
+    groups = {f'activity-{i}': _scores(rnd, 3) for i in range(max(2, size // 3 // 20))}
+    return lambda: compute_anova(groups)
+
+
+@benchmark('anova.compute_anova.one_huge_group', tiers=['medium', 'xl'])
+def _anova_one_huge(size):
+    from anova import compute_anova
+    rnd = random.Random(size)
+    groups = {'walking': _scores(rnd, size), 'reading': _scores(rnd, 2), 'gaming': _scores(rnd, 3)}
+    return lambda: compute_anova(groups)
+
+
+@benchmark('anova.compute_anova.zero_variance', tiers=['small', 'large'])
+def _anova_zero_variance(size):
+    from anova import compute_anova
+    groups = {a: [20 * (i % 3)] * max(2, size // 6) for i, a in enumerate(ACTIVITIES['activity'])}
+    return lambda: compute_anova(groups)
+
+
+# --- CCC ----------------------------------------------------------------------
+
+def _pairs(rnd, n, scale=20):
+    signed = lambda: rnd.choice([-1, 1]) * rnd.randint(1, 5) * scale
+    return [[signed(), signed()] for _ in range(n)]
+
+
+CCC_CFG = {'pos': 10.0, 'neg': -10.0, 'minPairs': 1, 'minCcc': 0.2, 'scale': 20.0}
+
+
+@benchmark('ccc.analyze_category', tiers=['tiny', 'small', 'medium', 'large', 'xl'])
+def _ccc_typical(size):
+    from concordance import analyze_category
+    rnd = random.Random(size)
+    activities = ACTIVITIES['activity']
+    groups = {a: _pairs(rnd, max(1, size // len(activities))) for a in activities}
+    return lambda: analyze_category(groups, CCC_CFG)
+
+
+@benchmark('ccc.analyze_category.many_small_groups', tiers=['small', 'large'])
+def _ccc_many_small(size):
+    from concordance import analyze_category
+    rnd = random.Random(size)
+    groups = {f'activity-{i}': _pairs(rnd, 2) for i in range(size // 2)}
+    return lambda: analyze_category(groups, CCC_CFG)
+
+
+@benchmark('ccc.analyze_category.one_huge_group', tiers=['large', 'xl'])
+def _ccc_one_huge(size):
+    from concordance import analyze_category
+    rnd = random.Random(size)
+    groups = {'walking': _pairs(rnd, size), 'reading': _pairs(rnd, 1)}
+    return lambda: analyze_category(groups, CCC_CFG)
+
+
+@benchmark('ccc.analyze_category.zero_variance', tiers=['small', 'large'])
+def _ccc_zero_variance(size):
+    from concordance import analyze_category
+    groups = {a: [[40, 40]] * max(2, size // 6) for a in ACTIVITIES['activity']}
+    return lambda: analyze_category(groups, CCC_CFG)
+
+
+@benchmark('ccc._ccc', tiers=['medium', 'xl'])
+def _ccc_raw(size):
+    from concordance import _ccc
+    rnd = random.Random(size)
+    x = [rnd.uniform(-100, 100) for _ in range(size)]
+    y = [v + rnd.gauss(0, 20) for v in x]
+    return lambda: _ccc(x, y)
+
+
+# --- sentiment ----------------------------------------------------------------
+
+@benchmark('sentiment.get_sentiment_score', tiers=['tiny', 'small', 'medium'])
+def _sentiment_loop(size):
+    from recommendation_sentiment import get_sentiment_score
+    comments = synthetic_comments(size)
+    return lambda: [get_sentiment_score(c) for c in comments]
+
+
+@benchmark('sentiment.get_sentiment_score.long_comment')
+def _sentiment_long():
+    from recommendation_sentiment import get_sentiment_score
+    text = ' '.join(synthetic_comments(200, seed=1))
+    return lambda: get_sentiment_score(text)
+
+
+@benchmark('sentiment.score_batch', tiers=['small', 'medium'])
+def _sentiment_batch(size):
+    from recommendation_sentiment import score_batch
+    comments = synthetic_comments(size)
+    return lambda: score_batch(comments)
+
+
+# --- runner -------------------------------------------------------------------
+
+def measure(fn, min_seconds, max_repeat):
+    start = time.perf_counter()
+    fn()  # warm caches and lazy imports
+    # Calls slower than the time floor get two timed runs instead of three
+    min_runs = 2 if time.perf_counter() - start > min_seconds else 3
+    samples = []
+    deadline = time.perf_counter() + min_seconds
+    while len(samples) < max_repeat and (len(samples) < min_runs or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'medianMs': round(statistics.median(samples) * 1000, 3),
+        'bestMs': round(min(samples) * 1000, 3),
+        'runs': len(samples),
+        'peakKb': round(peak / 1024, 1),
+    }
+
+
+def check(results, baseline):
+    """Regressions and missing baselines, per benchmark."""
+    report = {}
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            report[name] = {'status': 'new'}
+            continue
+        time_budget = base.get('timeBudget', DEFAULT_TIME_BUDGET)
+        memory_budget = base.get('memoryBudget', DEFAULT_MEMORY_BUDGET)
+        time_ratio = current['bestMs'] / base['bestMs'] if base['bestMs'] else 1.0
+        memory_ratio = current['peakKb'] / base['peakKb'] if base['peakKb'] else 1.0
+        failures = []
+        if time_ratio > time_budget:
+            failures.append(f'time x{time_ratio:.2f} > x{time_budget}')
+        if memory_ratio > memory_budget:
+            failures.append(f'memory x{memory_ratio:.2f} > x{memory_budget}')
+        report[name] = {
+            'status': 'regressed' if failures else 'ok',
+            'timeRatio': round(time_ratio, 3),
+            'memoryRatio': round(memory_ratio, 3),
+            'failures': failures,
+        }
+    return report
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('benchmarks', {})
+
+
+def write_baseline(path, results, previous):
+    benchmarks = {}
+    for name, current in sorted(results.items()):
+        old = previous.get(name, {})
+        benchmarks[name] = {
+            'bestMs': current['bestMs'],
+            'medianMs': current['medianMs'],
+            'peakKb': current['peakKb'],
+            'timeBudget': old.get('timeBudget', DEFAULT_TIME_BUDGET),
+            'memoryBudget': old.get('memoryBudget', DEFAULT_MEMORY_BUDGET),
+        }
+    # Keep entries that were not part of this run (e.g. a --tiers subset)
+    for name, entry in previous.items():
+        benchmarks.setdefault(name, entry)
+    with open(path, 'w') as f:
+        json.dump({
+            'host': {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()},
+            'updatedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'benchmarks': dict(sorted(benchmarks.items())),
+        }, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tiers', default=','.join(TIERS), help=f"comma-separated subset of {', '.join(TIERS)}")
+    parser.add_argument('--filter', default='', help='only benchmarks whose name contains this')
+    parser.add_argument('--min-seconds', type=float, default=0.5, help='minimum timed duration per benchmark')
+    parser.add_argument('--max-repeat', type=int, default=50)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--out', default=None, help='also write the JSON report here')
+    args = parser.parse_args()
+
+    tiers = set(args.tiers.split(','))
+    selected = [
+        name for name in BENCHMARKS
+        if args.filter in name and ('[' not in name or name[name.index('[') + 1:-1] in tiers)
+    ]
+
+    warnings.simplefilter('ignore')  # zero-variance shapes make scipy warn on every call
+    results = {}
+    for name in selected:
+        fn = BENCHMARKS[name]()
+        results[name] = measure(fn, args.min_seconds, args.max_repeat)
+        r = results[name]
+        print(f"{name:60s} median {r['medianMs']:>10.3f} ms  best {r['bestMs']:>10.3f} ms  "
+              f"peak {r['peakKb']:>10.1f} KiB  ({r['runs']} runs)", file=sys.stderr)
+
+    baseline = load_baseline(args.baseline)
+    report = check(results, baseline)
+    regressed = sorted(n for n, r in report.items() if r['status'] == 'regressed')
+    for name in regressed:
+        print(f"REGRESSION {name}: {'; '.join(report[name]['failures'])}", file=sys.stderr)
+
+    output = {'results': results, 'comparison': report, 'regressions': regressed}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(output, f, indent=2)
+    if args.update_baseline:
+        write_baseline(args.baseline, results, baseline)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    print(json.dumps({'regressions': regressed, 'new': sorted(n for n, r in report.items() if r['status'] == 'new')}))
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+JSON encode/decode benchmark: Flask's default provider vs NumpyJSONProvider.
+
+    python -m benchmarks.bench_json --comments 10000 --users 200 --logs 5000
+
+Covers a large /api/sentiment/batch response and request body, a
+multi-category /api/predict-mood-all-categories response repeated per user
+(the bulk shape), and a mood-log request body. Prints JSON timings.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import NumpyJSONProvider, orjson
+from loadtest.synthetic import synthetic_mood_logs
+
+
+def sentiment_batch_response(n, seed=0):
+    rnd = random.Random(seed)
+    words = ['ok', 'sobrang', 'nakakarelax', 'helpful', 'boring', 'salamat', 'tired', 'happy', 'walang', 'kwenta']
+    results = []
+    for _ in range(n):
+        score = rnd.uniform(-1, 1)
+        results.append({
+            'comment': ' '.join(rnd.choice(words) for _ in range(rnd.randint(3, 25))),
+            'sentimentScore': score,
+            'sentimentUsed': True,
+            'effectiveHint': 'positive' if score > 0.25 else ('negative' if score < -0.25 else 'neutral'),
+        })
+    return {'success': True, 'results': results}
+
+
+def multi_category_response(users, logs_per_user):
+    from prediction import CategoryMoodPredictor
+    predictor = CategoryMoodPredictor()
+    bulk = {}
+    for u in range(users):
+        logs = synthetic_mood_logs(logs_per_user, seed=u)
+        user_preds = {}
+        for category in predictor.categories:
+            predictions, error, _ = predictor.prepare_category_data(logs, category)
+            user_preds[category] = {
+                day: {
+                    'predictedMood': p['prediction'],
+                    'actualMood': None,
+                    'allMoodProbabilities': p['emotion_breakdown'],
+                }
+                for day, p in (predictions or {}).items()
+            }
+        bulk[f'user-{u}'] = user_preds
+    return {'success': True, 'predictions': bulk}
+
+
+def bench(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {'bestMs': round(min(samples) * 1000, 3), 'medianMs': round(statistics.median(samples) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--logs', type=int, default=5000, help='logs in the mood-log request body')
+    parser.add_argument('--repeat', type=int, default=15)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {'default': DefaultJSONProvider(app), 'numpy': NumpyJSONProvider(app)}
+
+    payloads = {
+        'sentiment_batch_response': sentiment_batch_response(args.comments),
+        'multi_category_response': multi_category_response(args.users, 120),
+    }
+    bodies = {
+        'sentiment_batch_request': json.dumps({'comments': [r['comment'] for r in payloads['sentiment_batch_response']['results']]}).encode(),
+        'mood_logs_request': json.dumps({'mood_logs': synthetic_mood_logs(args.logs)}).encode(),
+    }
+
+    results = {}
+    with app.app_context():
+        for name, obj in payloads.items():
+            row = {}
+            for pname, provider in providers.items():
+                row[pname] = bench(lambda: provider.response(obj).get_data(), args.repeat)
+            row['bytes'] = len(providers['numpy'].response(obj).get_data())
+            row['speedup'] = round(row['default']['medianMs'] / row['numpy']['medianMs'], 2)
+            results[f'encode:{name}'] = row
+        for name, raw in bodies.items():
+            row = {}
+            for pname, provider in providers.items():
+                row[pname] = bench(lambda: provider.loads(raw), args.repeat)
+            row['bytes'] = len(raw)
+            row['speedup'] = round(row['default']['medianMs'] / row['numpy']['medianMs'], 2)
+            results[f'decode:{name}'] = row
+
+    print(json.dumps({'orjson': orjson is not None, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
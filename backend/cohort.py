@@ -0,0 +1,269 @@
+import logging
+import os
+import numpy as np
+from flask import Blueprint, request, jsonify
+from admission import BATCH, admission_control
+from analytics import mood_scores, numeric_column, signed_intensity
+from concordance import ccc_config
+from metrics import stage
+from readiness import lazy_import
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('cohort', __name__)
+
+COHORT_MAX_ROWS = int(os.getenv('COHORT_MAX_ROWS', 2_000_000))
+SECTIONS = ['anova', 'ccc']
+AGGREGATES = ['rows', 'student']
+REQUIRED_COLUMNS = ['student', 'category', 'activity']
+VALUE_COLUMNS = ['score', 'before', 'after', 'beforeValence', 'beforeIntensity', 'afterValence', 'afterIntensity']
+INSUFFICIENT = "Logs are still insufficient to run a proper analysis. Come back later!"
+
+
+class CohortError(ValueError):
+    pass
+
+
+def cohort_frame(columns, scale):
+    """
+    One row per log: student, category, activity, score and signed
+    before/after. `score` falls back to the Node moodScore formula when
+    only intensities are given; `before`/`after` fall back to valence x
+    intensity x scale, as the CCC controller signs them.
+    """
+    pd = lazy_import('pandas')
+    # Unknown columns are ignored rather than copied into the frame
+    columns = {k: v for k, v in columns.items() if k in REQUIRED_COLUMNS or k in VALUE_COLUMNS}
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise CohortError(f"Missing columns: {', '.join(missing)}")
+    lengths = {len(v) if isinstance(v, list) else -1 for v in columns.values()}
+    if len(lengths) != 1 or -1 in lengths:
+        raise CohortError('Every column must be a list of the same length')
+    n = lengths.pop()
+    if n > COHORT_MAX_ROWS:
+        raise CohortError(f'Too many rows ({n}); the limit is {COHORT_MAX_ROWS}')
+
+    raw = pd.DataFrame(columns)
+    activity = raw['activity']
+    frame = pd.DataFrame({
+        'student': raw['student'].astype(str).astype('category'),
+        'category': raw['category'].astype(str).astype('category'),
+        # JS `activity || 'unknown'`
+        'activity': activity.where(activity.notna() & (activity != ''), 'unknown').astype(str).astype('category'),
+    })
+    if 'score' in raw.columns:
+        frame['score'] = numeric_column(raw, 'score')
+    else:
+        frame['score'] = mood_scores(numeric_column(raw, 'beforeIntensity'), numeric_column(raw, 'afterIntensity'))
+    if 'before' in raw.columns and 'after' in raw.columns:
+        frame['before'] = numeric_column(raw, 'before')
+        frame['after'] = numeric_column(raw, 'after')
+    else:
+        frame['before'] = signed_intensity(raw, 'beforeValence', 'beforeIntensity', scale)
+        frame['after'] = signed_intensity(raw, 'afterValence', 'afterIntensity', scale)
+    return frame
+
+
+def _units(frame, values, aggregate):
+    """Rows with every value present; with aggregate='student', one mean per student and activity."""
+    rows = frame.dropna(subset=values)
+    if aggregate != 'student':
+        return rows
+    keys = ['category', 'activity', 'student']
+    return rows.groupby(keys, observed=True, sort=False)[values].mean().reset_index()
+
+
+def _ccc_from_moments(n, mean_b, mean_a, var_b, var_a, cov):
+    """Concordance correlation from per-group moments; NaN where concordance._ccc returns None."""
+    denom = var_b + var_a + (mean_b - mean_a) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ccc = 2.0 * cov / denom
+    return np.where((n >= 2) & (denom > 0), ccc, np.nan)
+
+
+def _students(units):
+    return units.groupby(['category', 'activity'], observed=True)['student'].nunique()
+
+
+def cohort_anova(frame, aggregate='rows'):
+    """One-way F-test across activities per category, from grouped count/mean/variance."""
+    stats_module = lazy_import('scipy.stats')
+    units = _units(frame, ['score'], aggregate)
+    stats = units.groupby(['category', 'activity'], observed=True)['score'].agg(['count', 'mean', 'var'])
+    stats['students'] = _students(units)
+    listed = frame.groupby(['category', 'activity'], observed=True).size()
+
+    results = {}
+    for category in listed.index.get_level_values(0).unique():
+        groups = stats.loc[category] if category in stats.index.get_level_values(0) else stats.iloc[:0]
+        included = groups[groups['count'] >= 2]
+        ignored = [a for a in listed.loc[category].index if a not in included.index]
+        if len(included) < 2:
+            results[category] = {'success': False, 'message': INSUFFICIENT, 'ignoredGroups': ignored}
+            continue
+
+        n = included['count'].to_numpy(dtype=float)
+        means = included['mean'].to_numpy()
+        grand = float((n * means).sum() / n.sum())
+        df_between = len(included) - 1
+        df_within = int(n.sum()) - len(included)
+        msb = float((n * (means - grand) ** 2).sum()) / df_between
+        msw = float(((n - 1) * included['var'].to_numpy()).sum()) / df_within if df_within > 0 else None
+        if msw:
+            f_value = msb / msw
+            p_value = float(stats_module.f.sf(f_value, df_between, df_within))
+        else:
+            # f_oneway's results when every group is constant
+            f_value, p_value = (float('inf'), 0.0) if msb > 0 else (float('nan'), float('nan'))
+
+        results[category] = {
+            'success': True,
+            'F_value': round(f_value, 4),
+            'p_value': round(p_value, 6),
+            'MSB': round(msb, 4),
+            'MSW': round(msw, 4) if msw is not None else None,
+            'groupMeans': {a: round(float(m), 2) for a, m in included['mean'].items()},
+            'groupCounts': {a: int(c) for a, c in included['count'].items()},
+            'groupVariances': {a: float(v) for a, v in included['var'].items()},
+            'groupStudents': {a: int(s) for a, s in included['students'].items()},
+            'interpretation': (
+                "Some activities showed different mood impacts."
+                if p_value < 0.05 else "Activities had similar mood impacts."
+            ),
+            'includedGroups': list(included.index),
+            'ignoredGroups': ignored,
+        }
+    return results
+
+
+def _labels(n, mean_delta, ccc, cfg):
+    """Vectorized concordance._classify; None below minPairs."""
+    by_delta = np.select([mean_delta >= cfg['pos'], mean_delta <= cfg['neg']], ['boosted', 'lowered'], 'neutral')
+    gated = (n >= 2) & bool(cfg['minCcc']) & (np.isnan(ccc) | (ccc < cfg['minCcc']))
+    labels = np.where(gated, 'neutral', by_delta).astype(object)
+    labels[n < cfg['minPairs']] = None
+    return labels
+
+
+def cohort_ccc(frame, cfg, aggregate='rows'):
+    """
+    analyze_category for every category at once: per-activity mean delta,
+    CCC and label from grouped moments, shaped like /api/ccc/run results.
+    """
+    units = _units(frame, ['before', 'after'], aggregate)
+    keys = ['category', 'activity']
+    grouped = units.groupby(keys, observed=True)
+    stats = grouped.agg(n=('before', 'size'), mean_b=('before', 'mean'), mean_a=('after', 'mean'),
+                        var_b=('before', 'var'), var_a=('after', 'var'))
+    centered = ((units['before'] - grouped['before'].transform('mean'))
+                * (units['after'] - grouped['after'].transform('mean')))
+    stats['cov'] = centered.groupby([units['category'], units['activity']], observed=True).sum() / (stats['n'] - 1)
+    stats['students'] = _students(units)
+    n = stats['n'].to_numpy()
+    stats['mean_delta'] = stats['mean_a'] - stats['mean_b']
+    stats['ccc'] = _ccc_from_moments(n, stats['mean_b'].to_numpy(), stats['mean_a'].to_numpy(),
+                                     stats['var_b'].to_numpy(), stats['var_a'].to_numpy(), stats['cov'].to_numpy())
+    stats['label'] = _labels(n, stats['mean_delta'].to_numpy(), stats['ccc'].to_numpy(), cfg)
+
+    listed = frame.groupby(keys, observed=True).size()
+    results = {}
+    for category in listed.index.get_level_values(0).unique():
+        groups = stats.loc[category] if category in stats.index.get_level_values(0) else stats.iloc[:0]
+        included = groups[groups['label'].notna()]
+        ignored = [a for a in listed.loc[category].index if a not in included.index]
+        means = {a: round(float(m), 2) for a, m in included['mean_delta'].items()}
+
+        paired = units[(units['category'] == category) & units['activity'].isin(included.index)]
+        overall = None
+        if len(paired) >= 2:
+            b, a = paired['before'].to_numpy(), paired['after'].to_numpy()
+            value = _ccc_from_moments(len(b), b.mean(), a.mean(), b.var(ddof=1), a.var(ddof=1),
+                                      float(np.cov(b, a, ddof=1)[0, 1]))
+            overall = None if np.isnan(value) else {'ccc': float(value)}
+
+        results[category] = {
+            'success': len(included) > 0,
+            'includedGroups': list(included.index),
+            'ignoredGroups': ignored,
+            'groupCounts': {a: int(c) for a, c in included['n'].items()},
+            'groupMeans': means,
+            'groupCcc': {a: (None if np.isnan(c) else round(float(c), 4)) for a, c in included['ccc'].items()},
+            'groupStudents': {a: int(s) for a, s in included['students'].items()},
+            'labels': dict(included['label'].items()),
+            'topPositive': [{'activity': a, 'moodScore': m}
+                            for a, m in sorted(means.items(), key=lambda x: x[1], reverse=True) if m > 0],
+            'topNegative': [{'activity': a, 'moodScore': m}
+                            for a, m in sorted(means.items(), key=lambda x: x[1]) if m < 0],
+            'overall': overall,
+            'insufficient': len(included) == 0,
+            'message': "Not enough paired logs to analyze." if len(included) == 0 else None,
+        }
+    return results
+
+
+@bp.route('/api/cohort/analytics', methods=['POST'])
+@admission_control(BATCH)
+def cohort_analytics():
+    """
+    Class-wide ANOVA and CCC over many students in one call.
+
+    Body:
+    {
+      "columns": {
+        "student":  [...], "category": [...], "activity": [...],
+        "score":    [...],                                  (optional moodScore per row)
+        "beforeValence": [...], "beforeIntensity": [...],   (optional, as in mood logs)
+        "afterValence":  [...], "afterIntensity":  [...],
+        "before": [...], "after": [...]                     (optional signed values instead)
+      },
+      "sections": ["anova", "ccc"],                         (optional, default both)
+      "aggregate": "rows",                                  ("student": one mean per student and activity)
+      "thresholds": { "pos": 10, "neg": -10, "minPairs": 1, "minCcc": 0.2, "scale": 20 }
+    }
+
+    Every category present is analyzed, each activity being a group. With
+    "student" aggregation every student counts once per activity, so heavy
+    loggers do not dominate the class view.
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        columns = body.get('columns')
+        if not isinstance(columns, dict):
+            return jsonify({'success': False, 'message': 'columns is required'}), 400
+        sections = body.get('sections') or SECTIONS
+        aggregate = body.get('aggregate') or 'rows'
+        valid_sections = isinstance(sections, list) and all(isinstance(s, str) and s in SECTIONS for s in sections)
+        if not valid_sections or not isinstance(aggregate, str) or aggregate not in AGGREGATES:
+            return jsonify({
+                'success': False,
+                'message': f"sections must be a list from {', '.join(SECTIONS)}; aggregate one of {', '.join(AGGREGATES)}"
+            }), 400
+
+        cfg = ccc_config(body.get('thresholds'))
+        try:
+            with stage('cohort.frame_build'):
+                frame = cohort_frame(columns, cfg['scale'])
+        except (CohortError, ValueError, TypeError) as e:
+            return jsonify({'success': False, 'message': f'Invalid columns: {str(e)}'}), 400
+
+        result = {
+            'success': True,
+            'aggregate': aggregate,
+            'rows': len(frame),
+            'students': int(frame['student'].nunique()),
+        }
+        if 'anova' in sections:
+            with stage('cohort.anova'):
+                result['anova'] = cohort_anova(frame, aggregate)
+        if 'ccc' in sections:
+            with stage('cohort.ccc'):
+                result['ccc'] = {'results': cohort_ccc(frame, cfg, aggregate), 'thresholds': cfg}
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Cohort API Error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'error': str(e)
+        }), 500
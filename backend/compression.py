@@ -0,0 +1,177 @@
+import gzip
+import io
+import json
+import logging
+import os
+import zlib
+from flask import current_app, request
+from werkzeug.wsgi import get_input_stream
+
+try:
+    import zstandard
+except ImportError:  # zstd is negotiated only when available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Guard against zip bombs: a compressed request body may not inflate past this.
+MAX_DECOMPRESSED_BYTES = int(os.getenv('MAX_DECOMPRESSED_BYTES', 64 * 1024 * 1024))
+# Responses smaller than this are sent uncompressed.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+ZSTD_LEVEL = int(os.getenv('ZSTD_LEVEL', 3))
+
+READ_CHUNK = 64 * 1024
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+class UnsupportedEncoding(Exception):
+    pass
+
+
+def compression_options(enabled=True, min_size=None, gzip_level=None, zstd_level=None):
+    """
+    Per-route response compression settings, applied below the route decorator:
+
+        @bp.route('/api/sentiment', methods=['POST'])
+        @compression_options(enabled=False)
+        def api_sentiment(): ...
+    """
+    def decorator(view):
+        view.compression_options = {
+            'enabled': enabled,
+            'min_size': COMPRESSION_MIN_SIZE if min_size is None else min_size,
+            'gzip_level': GZIP_LEVEL if gzip_level is None else gzip_level,
+            'zstd_level': ZSTD_LEVEL if zstd_level is None else zstd_level,
+        }
+        return view
+    return decorator
+
+
+_DEFAULT_OPTIONS = compression_options()(lambda: None).compression_options
+
+
+def _inflate(stream, limit):
+    # wbits=47 accepts both gzip and zlib ("deflate") framing
+    d = zlib.decompressobj(wbits=47)
+    out = bytearray()
+    for chunk in iter(lambda: stream.read(READ_CHUNK), b''):
+        data = chunk
+        while data:
+            out += d.decompress(data, limit + 1 - len(out))
+            if len(out) > limit:
+                raise PayloadTooLarge()
+            data = d.unconsumed_tail
+    out += d.flush()
+    if len(out) > limit:
+        raise PayloadTooLarge()
+    if not d.eof:
+        raise ValueError('truncated stream')
+    return bytes(out)
+
+
+def _unzstd(stream, limit):
+    if zstandard is None:
+        raise UnsupportedEncoding('zstd')
+    out = bytearray()
+    with zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True) as reader:
+        for chunk in iter(lambda: reader.read(min(READ_CHUNK, limit + 1 - len(out))), b''):
+            out += chunk
+            if len(out) > limit:
+                raise PayloadTooLarge()
+    return bytes(out)
+
+
+_DECODERS = {
+    'gzip': _inflate,
+    'x-gzip': _inflate,
+    'deflate': _inflate,
+    'zstd': _unzstd,
+}
+
+
+class DecompressRequestMiddleware:
+    """
+    WSGI middleware that inflates gzip/deflate/zstd request bodies before
+    Flask sees them, so request.get_json() works unchanged. Bodies that
+    inflate past `max_size` get 413, unknown encodings 415 and corrupt
+    streams 400.
+    """
+
+    def __init__(self, wsgi_app, max_size=MAX_DECOMPRESSED_BYTES):
+        self.wsgi_app = wsgi_app
+        self.max_size = max_size
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if not encoding or encoding == 'identity':
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            decoder = _DECODERS.get(encoding)
+            if decoder is None:
+                raise UnsupportedEncoding(encoding)
+            body = decoder(get_input_stream(environ), self.max_size)
+        except PayloadTooLarge:
+            return self._error(start_response, '413 Payload Too Large',
+                               f'decompressed body exceeds {self.max_size} bytes')
+        except UnsupportedEncoding as e:
+            return self._error(start_response, '415 Unsupported Media Type',
+                               f'unsupported Content-Encoding: {e}')
+        except Exception as e:
+            logger.warning(f"Failed to decode {encoding} request body: {str(e)}")
+            return self._error(start_response, '400 Bad Request', f'invalid {encoding} body')
+
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+        environ.pop('HTTP_CONTENT_ENCODING', None)
+        environ.pop('HTTP_TRANSFER_ENCODING', None)
+        environ['wsgi.input_terminated'] = False
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def _error(start_response, status, message):
+        body = json.dumps({'success': False, 'error': message}).encode()
+        start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
+
+
+def _negotiate(accept):
+    if zstandard is not None and accept.quality('zstd') > 0 and accept.quality('zstd') >= accept.quality('gzip'):
+        return 'zstd'
+    if accept.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def _compress_response(response):
+    view = current_app.view_functions.get(request.endpoint)
+    options = getattr(view, 'compression_options', _DEFAULT_OPTIONS)
+    if not options['enabled'] or response.direct_passthrough or response.is_streamed:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 304) or 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < options['min_size']:
+        return response
+
+    if encoding == 'zstd':
+        compressed = zstandard.ZstdCompressor(level=options['zstd_level']).compress(data)
+    else:
+        compressed = gzip.compress(data, compresslevel=options['gzip_level'], mtime=0)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app, max_size=MAX_DECOMPRESSED_BYTES):
+    app.wsgi_app = DecompressRequestMiddleware(app.wsgi_app, max_size)
+    app.after_request(_compress_response)
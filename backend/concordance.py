@@ -1,5 +1,9 @@
 import numpy as np
 from flask import Blueprint, request, jsonify
+from admission import BATCH, admission_control
+from etags import conditional_on_body
+from metrics import stage
+from readiness import register_warmup
 
 ccc_bp = Blueprint('ccc', __name__)
 
@@ -182,7 +186,47 @@ def analyze_category(groups, cfg):
     }
 
 
+def _warm_ccc():
+    cfg = {
+        "pos": DEFAULT_POS_DELTA_THRESHOLD,
+        "neg": DEFAULT_NEG_DELTA_THRESHOLD,
+        "minPairs": DEFAULT_MIN_PAIRED_LOGS,
+        "minCcc": DEFAULT_MIN_CCC,
+        "scale": DEFAULT_SCALE_FACTOR,
+    }
+    analyze_category({"walking": [[-20, 40], [20, 60], [-40, 20]]}, cfg)
+
+
+register_warmup('ccc', _warm_ccc)
+
+
+def ccc_config(thresholds):
+    """Request thresholds merged over the defaults."""
+    th = thresholds or {}
+    return {
+        "pos": float(th.get("pos", DEFAULT_POS_DELTA_THRESHOLD)),
+        "neg": float(th.get("neg", DEFAULT_NEG_DELTA_THRESHOLD)),
+        "minPairs": int(th.get("minPairs", DEFAULT_MIN_PAIRED_LOGS)),
+        "minCcc": float(th.get("minCcc", DEFAULT_MIN_CCC)),
+        "scale": float(th.get("scale", DEFAULT_SCALE_FACTOR)),
+    }
+
+
+def ccc_results(data, cfg):
+    """Response body of /api/ccc/run for {category: {activity: payload}}."""
+    results = {}
+    any_success = False
+    for category, groups in data.items():
+        with stage('ccc.analyze_category'):
+            cat_res = analyze_category(groups, cfg)
+        results[category] = cat_res
+        any_success = any_success or cat_res["success"]
+    return {"success": any_success, "results": results}
+
+
 @ccc_bp.route('/api/ccc/run', methods=['POST'])
+@conditional_on_body('ccc-run')
+@admission_control(BATCH)
 def run_ccc():
     """
     Body:
@@ -200,20 +244,5 @@ def run_ccc():
     if not isinstance(data, dict):
         return jsonify({"success": False, "error": "Missing data"}), 400
 
-    th = body.get("thresholds") or {}
-    cfg = {
-        "pos": float(th.get("pos", DEFAULT_POS_DELTA_THRESHOLD)),
-        "neg": float(th.get("neg", DEFAULT_NEG_DELTA_THRESHOLD)),
-        "minPairs": int(th.get("minPairs", DEFAULT_MIN_PAIRED_LOGS)),
-        "minCcc": float(th.get("minCcc", DEFAULT_MIN_CCC)),
-        "scale": float(th.get("scale", DEFAULT_SCALE_FACTOR)),
-    }
-
-    results = {}
-    any_success = False
-    for category, groups in data.items():
-        cat_res = analyze_category(groups, cfg)
-        results[category] = cat_res
-        any_success = any_success or cat_res["success"]
-
-    return jsonify({"success": any_success, "results": results}), 200
\ No newline at end of file
+    cfg = ccc_config(body.get("thresholds"))
+    return jsonify(ccc_results(data, cfg)), 200
\ No newline at end of file
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, make_response, request
+from werkzeug.http import parse_etags
+
+from metrics import register_gauge
+
+logger = logging.getLogger(__name__)
+
+# Conditional responses for routes whose result is a pure function of their
+# inputs. The ETag is a digest of the inputs (request body or the Node API's
+# log payload), the route, the current ISO week and ETAG_SALT; bump the salt
+# when a deploy changes what a route computes from the same inputs.
+ETAGS = os.getenv('ETAGS', 'true').lower() in ('1', 'true', 'yes')
+ETAG_SALT = os.getenv('ETAG_SALT', '1')
+# Serialized 200 bodies kept per process, so a repeat fingerprint skips the computation
+ETAG_CACHE_ENTRIES = int(os.getenv('ETAG_CACHE_ENTRIES', 512))
+ETAG_CACHE_MAX_BYTES = int(os.getenv('ETAG_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+# Per-user data: clients and proxies may store it but must revalidate
+CACHE_CONTROL = 'private, no-cache'
+
+NOT_MODIFIED = 'not_modified'
+CACHE_HIT = 'cache_hit'
+MISS = 'miss'
+
+
+class ResultCache:
+    """LRU of serialized response bodies by ETag, bounded by entries and bytes."""
+
+    def __init__(self, max_entries=ETAG_CACHE_ENTRIES, max_bytes=ETAG_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        with self._lock:
+            payload = self._entries.get(etag)
+            if payload is not None:
+                self._entries.move_to_end(etag)
+            return payload
+
+    def put(self, etag, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[etag] = payload
+            self.size += len(payload)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = ResultCache()
+_counts_lock = threading.Lock()
+_counts = {}   # (route, outcome) -> responses
+
+
+def iso_week(today=None):
+    # UTC, like the Node log timestamps the prediction window is measured against
+    year, week, _ = (today or datetime.now(timezone.utc).date()).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def fingerprint(route, *parts):
+    """Weak ETag (without quotes) for `route` over `parts` (bytes or str) and the current ISO week."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (ETAG_SALT, route, iso_week()) + parts:
+        data = part if isinstance(part, (bytes, bytearray)) else str(part).encode()
+        # Length-prefixed so ('ab', 'c') and ('a', 'bc') differ
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _count(route, outcome):
+    with _counts_lock:
+        _counts[(route, outcome)] = _counts.get((route, outcome), 0) + 1
+
+
+def resolve(route, etag, if_none_match):
+    """
+    (outcome, cached payload) for a request carrying `if_none_match` (the
+    raw header, may be None): NOT_MODIFIED when the client already has this
+    fingerprint, CACHE_HIT with the stored body, or MISS.
+    """
+    if if_none_match and parse_etags(if_none_match).contains_weak(etag):
+        _count(route, NOT_MODIFIED)
+        return NOT_MODIFIED, None
+    payload = _cache.get(etag)
+    _count(route, CACHE_HIT if payload is not None else MISS)
+    return (CACHE_HIT, payload) if payload is not None else (MISS, None)
+
+
+def store(etag, payload):
+    _cache.put(etag, payload)
+
+
+def header_value(etag):
+    # Weak: the same ETag covers the gzip, zstd and identity encodings
+    return f'W/"{etag}"'
+
+
+def conditional_response(route, etag, compute):
+    """
+    Answer from the ETag when possible, else call `compute()` (any view
+    return value). Only 200 JSON responses get the ETag and are cached; the
+    compression hook runs afterwards, so the tag always describes the
+    uncompressed body.
+    """
+    if not ETAGS:
+        return compute()
+    outcome, payload = resolve(route, etag, request.headers.get('If-None-Match'))
+    if outcome == NOT_MODIFIED:
+        response = current_app.response_class(status=304)
+    elif outcome == CACHE_HIT:
+        response = current_app.response_class(payload, mimetype='application/json')
+    else:
+        response = make_response(compute())
+        if response.status_code != 200 or not response.is_json:
+            return response
+        store(etag, response.get_data())
+    response.headers['ETag'] = header_value(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def conditional_on_body(route):
+    """
+    ETags for POST routes that compute only from their JSON body:
+
+        @bp.route('/api/run-anova', methods=['POST'])
+        @conditional_on_body('run-anova')
+        @admission_control(BATCH)
+        def run_anova(): ...
+
+    Outside admission control, so 304s and cache hits are answered without
+    taking a batch slot. These are safe computations rather than state
+    changes, so a matching If-None-Match gets 304 (with no body) as a GET
+    would.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # After DecompressRequestMiddleware, so gzip and plain bodies match
+            etag = fingerprint(route, request.query_string, request.get_data(cache=True))
+            return conditional_response(route, etag, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def _responses():
+    with _counts_lock:
+        return {(('route', route), ('outcome', outcome)): n for (route, outcome), n in _counts.items()}
+
+
+register_gauge('mindful_etag_responses_total', 'Conditional responses by outcome (not_modified, cache_hit, miss).',
+               _responses, metric_type='counter')
+register_gauge('mindful_etag_cache_bytes', 'Bytes of response bodies held in the ETag result cache.',
+               lambda: {(): _cache.size})
@@ -0,0 +1,11 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in this directory
+(pass -c to use another file). Command-line options still take precedence.
+"""
+
+
+def post_worker_init(worker):
+    # Admission control caps batch waiters by the worker's request threads,
+    # however --threads / `threads` was set
+    import admission
+    admission.set_worker_threads(worker.cfg.threads)
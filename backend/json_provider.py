@@ -0,0 +1,73 @@
+import json
+import math
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback below
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    return DefaultJSONProvider.default(o)
+
+
+def _sanitize(o):
+    """NaN/Inf -> None for the stdlib path; orjson does this natively."""
+    if isinstance(o, float):
+        return None if math.isnan(o) or math.isinf(o) else o
+    if isinstance(o, dict):
+        return {k: _sanitize(v) for k, v in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [_sanitize(v) for v in o]
+    if isinstance(o, np.ndarray):
+        return _sanitize(o.tolist())
+    if isinstance(o, np.floating):
+        return _sanitize(float(o))
+    return o
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    App-wide JSON provider. Serializes NumPy scalars and arrays directly and
+    maps NaN/Inf to null, so endpoints can return analysis results without
+    per-field float()/safe_number() conversions. Uses orjson for both
+    responses and request bodies when it is installed, stdlib json otherwise.
+    Dates keep Flask's HTTP-date format.
+    """
+
+    def _orjson_option(self, indent=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=self._orjson_option(indent))
+        return self.dumps(obj, indent=2 if indent else None).encode()
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._orjson_option()).decode()
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('allow_nan', False)
+        return json.dumps(_sanitize(obj), **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,135 @@
+"""
+Admission check: flooding the batch routes must not starve /api/sentiment.
+
+    python -m loadtest.admission_flood --threads 4 --flood 64 --size 3000 --probes 40
+
+Serves the app with one gthread worker (or one aiohttp worker with
+--worker-class async, whose passthrough pool is ASYNC_CPU_WORKERS), keeps
+`--flood` requests in flight across the BATCH routes and meanwhile sends
+single-comment /api/sentiment requests one after another. Prints a JSON summary and exits nonzero unless
+every sentiment request got a 200 with sentimentUsed within `--deadline`
+seconds (the interactive class's admission deadline by default).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from loadtest.common import free_port, gunicorn_command, spawn, stop
+from loadtest.harness import ROUTES, WORKER_CLASSES
+from loadtest.synthetic import synthetic_comments
+
+FLOOD_ROUTES = [
+    'run-anova', 'ccc-run', 'analytics-user', 'cohort-analytics',
+    'predict-mood-all-categories', 'predict-mood-bulk', 'sentiment-batch',
+]
+
+
+async def flood(session, base, bodies, counter, statuses):
+    while True:
+        i = next(counter)
+        route = FLOOD_ROUTES[i % len(FLOOD_ROUTES)]
+        method, path, _ = ROUTES[route]
+        try:
+            async with session.request(method, base + path, data=bodies[route][i % len(bodies[route])],
+                                       headers={'Content-Type': 'application/json'}) as resp:
+                await resp.read()
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+        except aiohttp.ClientError:
+            statuses['exception'] = statuses.get('exception', 0) + 1
+
+
+async def probe(session, base, comment):
+    start = time.perf_counter()
+    try:
+        async with session.post(base + '/api/sentiment', json={'comment': comment}) as resp:
+            body = await resp.json(content_type=None)
+            status = resp.status
+    except (aiohttp.ClientError, ValueError) as e:
+        return {'status': 'exception', 'seconds': time.perf_counter() - start, 'error': str(e)}
+    result = {'status': status, 'seconds': time.perf_counter() - start}
+    if status != 200 or not isinstance(body, dict) or body.get('error') or not body.get('sentimentUsed'):
+        result['body'] = body
+    return result
+
+
+async def check(base, args):
+    bodies = {
+        route: [ROUTES[route][2](args.size, seed) for seed in range(args.variants)]
+        for route in FLOOD_ROUTES
+    }
+    comments = synthetic_comments(args.probes + 1, args.seed, min_words=5)
+    timeout = aiohttp.ClientTimeout(total=120)
+    statuses = {}
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0, force_close=True), timeout=timeout) as session:
+        # Load the scorers before the flood so the first probe does not pay for it
+        await probe(session, base, comments[-1])
+        counter = iter(range(sys.maxsize))
+        flooders = [asyncio.create_task(flood(session, base, bodies, counter, statuses)) for _ in range(args.flood)]
+        try:
+            await asyncio.sleep(args.ramp)
+            probes = []
+            for comment in comments[:args.probes]:
+                probes.append(await probe(session, base, comment))
+        finally:
+            for task in flooders:
+                task.cancel()
+            await asyncio.gather(*flooders, return_exceptions=True)
+
+    slow = [p for p in probes if p['seconds'] > args.deadline]
+    failed = [p for p in probes if p['status'] != 200 or 'body' in p]
+    seconds = sorted(p['seconds'] for p in probes)
+    return {
+        'workerClass': args.worker_class,
+        'threads': args.threads,
+        'flood': args.flood,
+        'deadlineMs': round(args.deadline * 1000, 1),
+        'floodStatuses': {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        'sentiment': {
+            'requests': len(probes),
+            'maxMs': round(seconds[-1] * 1000, 2) if seconds else None,
+            'p50Ms': round(seconds[len(seconds) // 2] * 1000, 2) if seconds else None,
+            'overDeadline': len(slow),
+            'failed': failed[:5],
+        },
+        'ok': bool(probes) and not slow and not failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--worker-class', choices=['gthread', 'async'], default='gthread')
+    parser.add_argument('--threads', type=int, default=4, help='gthread threads, or ASYNC_CPU_WORKERS for async')
+    parser.add_argument('--flood', type=int, default=64, help='batch requests kept in flight')
+    parser.add_argument('--size', type=int, default=3000, help='logs (or comments) per batch request')
+    parser.add_argument('--variants', type=int, default=4, help='distinct payloads per batch route')
+    parser.add_argument('--probes', type=int, default=40, help='sentiment requests sent during the flood')
+    parser.add_argument('--ramp', type=float, default=2.0, help='seconds of flooding before the first probe')
+    parser.add_argument('--deadline', type=float, default=1.0, help='seconds each sentiment request must finish in')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server-log', default=None, help='append server output to this file')
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        # No result cache, so every flood request does its full computation
+        env = {'ETAGS': 'false', 'SENTIMENT_JOB_DB': os.path.join(tmp, 'jobs.sqlite3'),
+               'ASYNC_CPU_WORKERS': str(args.threads)}
+        cls = WORKER_CLASSES[args.worker_class]
+        proc = spawn(gunicorn_command(port, threads=args.threads, worker_class=cls['worker_class'], app=cls['app']),
+                     port, env=env, log_path=args.server_log)
+        try:
+            result = asyncio.run(check(f'http://127.0.0.1:{port}', args))
+        finally:
+            stop(proc)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
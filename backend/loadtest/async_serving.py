@@ -0,0 +1,71 @@
+"""
+Load test for the upstream-bound prediction routes, sync vs async serving.
+
+    python -m loadtest.async_serving --mode both --requests 2000 --concurrency 200 --latency-ms 150
+
+Starts a fake Node API with artificial latency, then serves the app with
+sync gunicorn workers (main:app) and/or aiohttp workers
+(async_prediction:app), and prints throughput and latency per mode as JSON.
+"""
+import argparse
+import asyncio
+import json
+
+from loadtest.common import (
+    drive, fake_node_command, free_port, gunicorn_command, spawn, stop,
+)
+
+ROUTES = [
+    '/api/check-category-data',
+    '/api/predict-category-mood?category=activity',
+    '/api/predict-category-mood?category=social',
+]
+
+MODES = {
+    'sync': {'app': 'main:app', 'worker_class': 'sync'},
+    'async': {'app': 'async_prediction:app', 'worker_class': 'aiohttp.GunicornWebWorker'},
+}
+
+
+def run_mode(mode, node_url, args):
+    port = free_port()
+    proc = spawn(
+        gunicorn_command(port, workers=args.workers, worker_class=MODES[mode]['worker_class'],
+                         app=MODES[mode]['app']),
+        port, env={'NODE_API_URL': node_url})
+    try:
+        base = f'http://127.0.0.1:{port}'
+
+        def make_request(i):
+            headers = {'Authorization': f'Bearer user-{i % args.users}'}
+            return 'GET', base + ROUTES[i % len(ROUTES)], headers, None
+
+        result = asyncio.run(drive(make_request, args.requests, args.concurrency))
+    finally:
+        stop(proc)
+    return {'mode': mode, 'workers': args.workers, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--logs', type=int, default=120, help='logs per user served by the fake Node API')
+    parser.add_argument('--latency-ms', type=float, default=150)
+    args = parser.parse_args()
+
+    node_port = free_port()
+    node = spawn(fake_node_command(node_port, args.logs, args.latency_ms), node_port)
+    try:
+        modes = ['sync', 'async'] if args.mode == 'both' else [args.mode]
+        results = [run_mode(m, f'http://127.0.0.1:{node_port}', args) for m in modes]
+    finally:
+        stop(node)
+    print(json.dumps({'latencyMsUpstream': args.latency_ms, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, proc=None, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"process exited with {proc.returncode} before listening on {port}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"nothing listening on port {port} after {timeout}s")
+
+
+def spawn(args, port, env=None, log_path=None):
+    """Start a server process from the backend directory and wait until it listens."""
+    full_env = dict(os.environ, PYTHONUNBUFFERED='1', **(env or {}))
+    log = open(log_path, 'ab') if log_path else subprocess.DEVNULL
+    proc = subprocess.Popen(
+        args, cwd=BACKEND_DIR, env=full_env, stdout=log, stderr=subprocess.STDOUT,
+        start_new_session=True)
+    try:
+        wait_for_port(port, proc)
+    except Exception:
+        stop(proc)
+        raise
+    return proc
+
+
+def stop(proc, timeout=10):
+    if proc.poll() is not None:
+        return
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+def fake_node_command(port, logs, latency_ms, seed=0):
+    return [sys.executable, '-m', 'loadtest.fake_node', '--port', str(port),
+            '--logs', str(logs), '--latency-ms', str(latency_ms), '--seed', str(seed)]
+
+
+def gunicorn_command(port, workers=1, threads=1, worker_class='sync', app='main:app'):
+    return [sys.executable, '-m', 'gunicorn', app, '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--threads', str(threads),
+            '--worker-class', worker_class, '--timeout', '120', '--log-level', 'warning']
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def summarize(latencies, errors, elapsed):
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        'requests': len(lat) + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughputRps': round((len(lat) + errors) / elapsed, 1) if elapsed > 0 else None,
+        'latencyMs': {
+            'mean': ms(sum(lat) / len(lat)) if lat else None,
+            'p50': ms(percentile(lat, 50)),
+            'p90': ms(percentile(lat, 90)),
+            'p99': ms(percentile(lat, 99)),
+            'max': ms(lat[-1]) if lat else None,
+        },
+    }
+
+
+async def drive(make_request, total, concurrency, timeout=120, validate=None):
+    """
+    Issue `total` requests with at most `concurrency` in flight.
+    make_request(i) returns (method, url, headers, body), where body is None,
+    a JSON-serializable object, or pre-encoded JSON bytes.
+    Transport failures and 5xx responses count as errors; 4xx answers are
+    valid application responses (e.g. insufficient data) and are timed.
+    validate(status, body bytes), if given, returns a reason for answers
+    that are not what the route should produce; those count as errors too
+    and are tallied by reason under `invalid`.
+    """
+    latencies, errors, statuses, invalid = [], 0, {}, {}
+    counter = iter(range(total))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                method, url, headers, body = make_request(i)
+                if isinstance(body, bytes):
+                    kwargs = {'data': body, 'headers': {'Content-Type': 'application/json', **(headers or {})}}
+                else:
+                    kwargs = {'json': body, 'headers': headers}
+                start = time.perf_counter()
+                try:
+                    async with session.request(method, url, **kwargs) as resp:
+                        data = await resp.read()
+                        ok = resp.status < 500
+                        statuses[resp.status] = statuses.get(resp.status, 0) + 1
+                    seconds = time.perf_counter() - start
+                    reason = validate(resp.status, data) if ok and validate else None
+                    if reason:
+                        ok = False
+                        invalid[reason] = invalid.get(reason, 0) + 1
+                except Exception:
+                    ok = False
+                    statuses['exception'] = statuses.get('exception', 0) + 1
+                if ok:
+                    latencies.append(seconds)
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        **summarize(latencies, errors, elapsed),
+        'statuses': {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        'invalid': invalid,
+    }
@@ -0,0 +1,61 @@
+"""
+Local stand-in for the Node API endpoints the Python service calls.
+
+    python -m loadtest.fake_node --port 5002 --logs 120 --latency-ms 150
+
+GET /api/mood-logs-category returns seeded synthetic logs. Each bearer token
+gets its own stable data set, and an optional artificial delay mimics the
+real Mongo round trip. A token ending in `-n<count>` (e.g. `Bearer user-3-n3000`)
+overrides the number of logs returned for that user.
+"""
+import argparse
+import asyncio
+import json
+import re
+import zlib
+
+from aiohttp import web
+
+from loadtest.synthetic import synthetic_mood_logs
+
+CACHE = web.AppKey('cache', dict)
+CONFIG = web.AppKey('config', dict)
+LOG_COUNT = re.compile(r'-n(\d+)$')
+
+
+async def mood_logs_category(request):
+    token = request.headers.get('Authorization', '')
+    if not token.startswith('Bearer '):
+        return web.json_response({'success': False, 'message': 'Unauthorized'}, status=401)
+
+    cfg = request.app[CONFIG]
+    if cfg['latency_ms']:
+        await asyncio.sleep(cfg['latency_ms'] / 1000)
+
+    cache = request.app[CACHE]
+    body = cache.get(token)
+    if body is None:
+        seed = zlib.crc32(token.encode()) ^ cfg['seed']
+        count = LOG_COUNT.search(token)
+        logs = synthetic_mood_logs(int(count.group(1)) if count else cfg['logs'], seed=seed, days=30)
+        body = json.dumps({'success': True, 'logs': logs}).encode()
+        cache[token] = body
+    return web.Response(body=body, content_type='application/json')
+
+
+def make_app(logs=120, latency_ms=0, seed=0):
+    app = web.Application()
+    app[CONFIG] = {'logs': logs, 'latency_ms': latency_ms, 'seed': seed}
+    app[CACHE] = {}
+    app.router.add_get('/api/mood-logs-category', mood_logs_category)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--logs', type=int, default=120, help='logs returned per user')
+    parser.add_argument('--latency-ms', type=float, default=0, help='artificial delay per request')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    web.run_app(make_app(args.logs, args.latency_ms, args.seed), port=args.port, print=None)
@@ -0,0 +1,395 @@
+"""
+End-to-end load harness for every blueprint route.
+
+    python -m loadtest.harness run --configs sync:2x1,gthread:2x4,async:2 \\
+        --sizes 30,300,3000 --concurrency 1,16 --requests 200 --out results.json
+    python -m loadtest.harness compare before.json after.json
+
+Starts the fake Node API (loadtest.fake_node) and, for each worker
+configuration, a gunicorn server pointed at it. Every selected route is
+driven at each payload size and concurrency level. Payload size is the
+number of mood logs (or comments for the sentiment routes); Node-backed
+GET routes get that many logs from the fake Node API. Each scenario
+records throughput, latency percentiles, status counts and the server's
+RSS from /proc. The result is JSON tagged with the git commit, so runs can
+be compared across commits with `compare`. `run` exits nonzero if any
+response carried an `error` field or `sentimentUsed: false`, since those
+timings are of a skipped computation.
+
+Worker configurations are `<class>:<workers>x<threads>`, where class is
+sync, gthread or async (aiohttp workers serving async_prediction:app).
+
+The servers run with ETAGS=false by default, so every request is computed:
+the payload variants repeat, and with ETags on the timed requests would
+be answered from the result cache. `--etags` measures that cached mode
+instead; results record which mode ran under settings.etags.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from loadtest.common import (
+    BACKEND_DIR, drive, fake_node_command, free_port, gunicorn_command, spawn, stop,
+)
+from loadtest.synthetic import (
+    anova_payload, ccc_payload, cohort_payload, synthetic_comments, synthetic_mood_logs,
+)
+
+WORKER_CLASSES = {
+    'sync': {'app': 'main:app', 'worker_class': 'sync'},
+    'gthread': {'app': 'main:app', 'worker_class': 'gthread'},
+    'async': {'app': 'async_prediction:app', 'worker_class': 'aiohttp.GunicornWebWorker'},
+}
+
+
+def _encode(obj):
+    return json.dumps(obj).encode()
+
+
+def _logs_body(size, seed):
+    return _encode({'mood_logs': synthetic_mood_logs(size, seed=seed)})
+
+
+def _bulk_body(size, seed, users=10):
+    # `size` logs in total, split across users
+    per_user = max(1, size // users)
+    return _encode({'users': {f'user-{i}': synthetic_mood_logs(per_user, seed=seed + i) for i in range(users)}})
+
+
+def _analytics_body(size, seed):
+    return _encode({'mood_logs': synthetic_mood_logs(size, seed=seed, with_before=True)})
+
+
+# name -> (method, path, body builder(size, seed) or None). Node-backed GET
+# routes send a bearer token that tells the fake Node API how many logs to
+# return; the rest ignore it.
+ROUTES = {
+    'predict-category-mood': ('GET', '/api/predict-category-mood?category=activity', None),
+    'check-category-data': ('GET', '/api/check-category-data', None),
+    'debug-mood-data': ('GET', '/api/debug-mood-data', None),
+    'predict-mood': ('GET', '/api/predict-mood', None),
+    'predict-mood-all-categories': ('POST', '/api/predict-mood-all-categories', _logs_body),
+    'predict-mood-bulk': ('POST', '/api/predict-mood-bulk', _bulk_body),
+    'run-anova': ('POST', '/api/run-anova',
+                  lambda size, seed: _encode(anova_payload(synthetic_mood_logs(size, seed=seed, with_before=True)))),
+    'ccc-run': ('POST', '/api/ccc/run',
+                lambda size, seed: _encode(ccc_payload(synthetic_mood_logs(size, seed=seed, with_before=True)))),
+    'analytics-user': ('POST', '/api/analytics/user', _analytics_body),
+    # about 30 logs per student, as a month of daily logging
+    'cohort-analytics': ('POST', '/api/cohort/analytics',
+                         lambda size, seed: _encode(cohort_payload(
+                             synthetic_mood_logs(size, seed=seed, with_before=True), max(1, size // 30)))),
+    # long enough to be scored rather than skipped as comment_too_short
+    'sentiment': ('POST', '/api/sentiment',
+                  lambda size, seed: _encode({'comment': synthetic_comments(1, seed, min_words=5)[0]})),
+    'sentiment-batch': ('POST', '/api/sentiment/batch',
+                        lambda size, seed: _encode({'comments': synthetic_comments(size, seed)})),
+    'sentiment-job-submit': ('POST', '/api/sentiment/jobs',
+                             lambda size, seed: _encode({'comments': synthetic_comments(size, seed)})),
+    'sentiment-job-stats': ('GET', '/api/sentiment/jobs/stats', None),
+    'ready': ('GET', '/ready', None),
+    'health': ('GET', '/health', None),
+    'metrics': ('GET', '/metrics', None),
+}
+NODE_BACKED = {'predict-category-mood', 'check-category-data', 'debug-mood-data'}
+# Routes whose work grows with --sizes; the rest run once per concurrency level
+SIZED = NODE_BACKED | {
+    'predict-mood-all-categories', 'predict-mood-bulk', 'run-anova', 'ccc-run', 'analytics-user',
+    'cohort-analytics', 'sentiment-batch', 'sentiment-job-submit',
+}
+
+
+def check_body(status, data):
+    """
+    Reason a non-5xx answer is not a real result, or None: a JSON body with
+    an `error` field, or a sentiment answer that skipped scoring.
+    """
+    try:
+        body = json.loads(data)
+    except ValueError:
+        return None   # /metrics and other non-JSON routes
+    if not isinstance(body, dict):
+        return None
+    if body.get('error'):
+        return f"error: {body['error']}"
+    if body.get('sentimentUsed') is False:
+        return 'sentimentUsed: false'
+    return None
+
+
+def route_sizes(route, sizes):
+    return sizes if route in SIZED else [0]
+
+
+def parse_config(spec):
+    """'gthread:2x4' -> {'name': ..., 'class': 'gthread', 'workers': 2, 'threads': 4}"""
+    cls, _, shape = spec.partition(':')
+    if cls not in WORKER_CLASSES:
+        raise argparse.ArgumentTypeError(f"unknown worker class {cls!r}; choose from {', '.join(WORKER_CLASSES)}")
+    workers, _, threads = (shape or '1').partition('x')
+    return {'name': spec, 'class': cls, 'workers': int(workers), 'threads': int(threads or 1)}
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def _children(pid):
+    kids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # comm may contain spaces; ppid is the second field after it
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            kids.append(int(entry))
+    return kids
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss(pid):
+    """RSS of a gunicorn master and its workers, from /proc."""
+    workers = {child: _rss_bytes(child) for child in _children(pid)}
+    return {'master': _rss_bytes(pid), 'workers': workers}
+
+
+class RssSampler(threading.Thread):
+    """Tracks peak total and per-worker RSS while a scenario runs."""
+
+    def __init__(self, pid, interval=0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_total = 0
+        self.peak_worker = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            rss = tree_rss(self.pid)
+            self.peak_total = max(self.peak_total, rss['master'] + sum(rss['workers'].values()))
+            self.peak_worker = max([self.peak_worker, *rss['workers'].values()])
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self
+
+
+def _mb(value):
+    return round(value / (1024 * 1024), 1)
+
+
+def run_scenario(base, route, size, concurrency, args, bodies, pid):
+    method, path, _ = ROUTES[route]
+
+    def make_request(i):
+        user = i % args.variants
+        headers = {'Authorization': f'Bearer user-{user}-n{size}'}
+        return method, base + path, headers, bodies[user] if bodies else None
+
+    if args.warmup:
+        asyncio.run(drive(make_request, min(args.warmup, args.requests), concurrency, validate=check_body))
+    sampler = RssSampler(pid)
+    sampler.start()
+    try:
+        result = asyncio.run(drive(make_request, args.requests, concurrency, validate=check_body))
+    finally:
+        sampler.stop()
+    rss = tree_rss(pid)
+    return {
+        'route': route,
+        'size': size,
+        'concurrency': concurrency,
+        **result,
+        'rssMb': {
+            'master': _mb(rss['master']),
+            'workers': [_mb(v) for v in rss['workers'].values()],
+            'total': _mb(rss['master'] + sum(rss['workers'].values())),
+            'peakTotal': _mb(sampler.peak_total),
+            'peakWorker': _mb(sampler.peak_worker),
+        },
+    }
+
+
+def run_config(config, node_url, args, payloads, job_db):
+    cls = WORKER_CLASSES[config['class']]
+    port = free_port()
+    env = {'NODE_API_URL': node_url, 'SENTIMENT_JOB_DB': job_db, 'ETAGS': 'true' if args.etags else 'false'}
+    proc = spawn(gunicorn_command(port, config['workers'], config['threads'], cls['worker_class'], cls['app']),
+                 port, env=env, log_path=args.server_log)
+    base = f'http://127.0.0.1:{port}'
+    scenarios = []
+    try:
+        booted = tree_rss(proc.pid)
+        for route in args.routes:
+            for size in route_sizes(route, args.sizes):
+                for concurrency in args.concurrency:
+                    bodies = payloads.get((route, size))
+                    scenario = run_scenario(base, route, size, concurrency, args, bodies, proc.pid)
+                    scenarios.append(scenario)
+                    lat = scenario['latencyMs']
+                    print(f"[{config['name']}] {route} size={size} c={concurrency}: "
+                          f"{scenario['throughputRps']} rps, p50 {lat['p50']} ms, p99 {lat['p99']} ms, "
+                          f"errors {scenario['errors']}, rss {scenario['rssMb']['total']} MB", file=sys.stderr)
+                    if scenario['invalid']:
+                        print(f"[{config['name']}] {route} size={size} c={concurrency}: "
+                              f"invalid responses {scenario['invalid']}", file=sys.stderr)
+    finally:
+        stop(proc)
+    return {
+        **config,
+        'bootRssMb': {'master': _mb(booted['master']), 'workers': [_mb(v) for v in booted['workers'].values()]},
+        'scenarios': scenarios,
+    }
+
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    unknown = [r for r in args.routes if r not in ROUTES]
+    if unknown:
+        raise SystemExit(f"unknown routes: {', '.join(unknown)}; choose from {', '.join(ROUTES)}")
+
+    payloads = {}
+    for route in args.routes:
+        build = ROUTES[route][2]
+        if build is None:
+            continue
+        for size in route_sizes(route, args.sizes):
+            payloads[(route, size)] = [build(size, seed) for seed in range(args.variants)]
+
+    node_port = free_port()
+    node = spawn(fake_node_command(node_port, args.sizes[0], args.node_latency_ms, args.seed), node_port)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            configs = []
+            for i, config in enumerate(args.configs):
+                configs.append(run_config(config, f'http://127.0.0.1:{node_port}', args, payloads,
+                                          os.path.join(tmp, f'jobs-{i}.sqlite3')))
+    finally:
+        stop(node)
+
+    return {
+        'commit': _git_commit(),
+        'startedAt': args.started_at,
+        'host': {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()},
+        'settings': {
+            'requests': args.requests, 'warmup': args.warmup, 'variants': args.variants,
+            'sizes': args.sizes, 'concurrency': args.concurrency, 'nodeLatencyMs': args.node_latency_ms,
+            'etags': args.etags,
+        },
+        'configs': configs,
+    }
+
+
+def _index(results):
+    return {
+        (config['name'], s['route'], s['size'], s['concurrency']): s
+        for config in results['configs'] for s in config['scenarios']
+    }
+
+
+def compare(before, after):
+    """Per-scenario throughput, p99 and peak RSS deltas for scenarios present in both runs."""
+    old, new = _index(before), _index(after)
+    rows = []
+    for key in sorted(set(old) & set(new), key=str):
+        a, b = old[key], new[key]
+
+        def delta(x, y):
+            return round((y - x) / x * 100, 1) if x and y is not None else None
+
+        rows.append({
+            'config': key[0], 'route': key[1], 'size': key[2], 'concurrency': key[3],
+            'throughputRps': [a['throughputRps'], b['throughputRps']],
+            'throughputChangePct': delta(a['throughputRps'], b['throughputRps']),
+            'p99Ms': [a['latencyMs']['p99'], b['latencyMs']['p99']],
+            'p99ChangePct': delta(a['latencyMs']['p99'], b['latencyMs']['p99']),
+            'peakRssMb': [a['rssMb']['peakTotal'], b['rssMb']['peakTotal']],
+            'errors': [a['errors'], b['errors']],
+        })
+    # Runs from before the flag existed had ETags on
+    etags = [r.get('settings', {}).get('etags', True) for r in (before, after)]
+    return {'before': before.get('commit'), 'after': after.get('commit'), 'etags': etags, 'scenarios': rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rp = sub.add_parser('run', help='run the load test')
+    rp.add_argument('--configs', type=lambda v: [parse_config(s) for s in v.split(',') if s],
+                    default=[parse_config('sync:2x1'), parse_config('gthread:2x4')],
+                    help='comma-separated <class>:<workers>x<threads> (default sync:2x1,gthread:2x4)')
+    rp.add_argument('--routes', type=lambda v: [r for r in v.split(',') if r], default=list(ROUTES),
+                    help='comma-separated route names (default: all)')
+    rp.add_argument('--sizes', type=_int_list, default=[30, 300], help='logs (or comments) per request')
+    rp.add_argument('--concurrency', type=_int_list, default=[1, 16])
+    rp.add_argument('--requests', type=int, default=200, help='timed requests per scenario')
+    rp.add_argument('--warmup', type=int, default=20, help='untimed requests before each scenario')
+    rp.add_argument('--variants', type=int, default=8, help='distinct payloads / users per size')
+    rp.add_argument('--node-latency-ms', type=float, default=20)
+    rp.add_argument('--etags', action='store_true',
+                    help='serve with ETags and the result cache on (default off: every request is computed)')
+    rp.add_argument('--seed', type=int, default=0)
+    rp.add_argument('--server-log', default=None, help='append server output to this file')
+    rp.add_argument('--out', default=None, help='write JSON results here instead of stdout')
+
+    cp = sub.add_parser('compare', help='compare two result files')
+    cp.add_argument('before')
+    cp.add_argument('after')
+
+    args = parser.parse_args()
+    # Turn SIGTERM into SystemExit so the spawned servers are stopped
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(143))
+    if args.command == 'compare':
+        with open(args.before) as f, open(args.after) as g:
+            output = compare(json.load(f), json.load(g))
+    else:
+        args.started_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        output = run(args)
+
+    text = json.dumps(output, indent=2)
+    if getattr(args, 'out', None):
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.command == 'run' and any(s['invalid'] for c in output['configs'] for s in c['scenarios']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+CATEGORIES = ['activity', 'social', 'health', 'sleep']
+ACTIVITIES = {
+    'activity': ['walking', 'studying', 'gaming', 'reading', 'drawing', 'cooking'],
+    'social': ['friends', 'family', 'classmates', 'alone', 'online'],
+    'health': ['exercise', 'meditation', 'stretching', 'jogging'],
+}
+NEGATIVE_EMOTIONS = ['bored', 'sad', 'disappointed', 'angry', 'tense']
+POSITIVE_EMOTIONS = ['calm', 'relaxed', 'pleased', 'happy', 'excited']
+
+
+def synthetic_mood_logs(n, seed=0, days=30, now=None, with_before=False):
+    """
+    Seeded mood logs shaped like the Node API's /api/mood-logs-category
+    response, spread uniformly over the last `days` days. With
+    `with_before` the logs also carry the before* fields the ANOVA and
+    CCC controllers read.
+    """
+    rnd = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    logs = []
+    for _ in range(n):
+        category = rnd.choice(CATEGORIES)
+        positive = rnd.random() < 0.6
+        log = {
+            'category': category,
+            'activity': None if category == 'sleep' else rnd.choice(ACTIVITIES[category]),
+            'hrs': round(rnd.uniform(3, 10), 1) if category == 'sleep' else None,
+            'afterEmotion': rnd.choice(POSITIVE_EMOTIONS if positive else NEGATIVE_EMOTIONS),
+            'afterValence': 'positive' if positive else 'negative',
+            'afterIntensity': rnd.randint(1, 5),
+            'afterReason': None,
+            'timestamp': (now - timedelta(seconds=rnd.uniform(0, days * 86400)))
+                         .isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        }
+        if with_before:
+            before_positive = rnd.random() < 0.5
+            log['beforeValence'] = 'positive' if before_positive else 'negative'
+            log['beforeEmotion'] = rnd.choice(POSITIVE_EMOTIONS if before_positive else NEGATIVE_EMOTIONS)
+            log['beforeIntensity'] = rnd.randint(1, 5)
+        logs.append(log)
+    return logs
+
+
+COMMENT_WORDS = ['ok', 'sobrang', 'nakakarelax', 'helpful', 'boring', 'salamat', 'tired', 'happy',
+                 'walang', 'kwenta', 'ang', 'ganda', 'not', 'really', 'good', 'tho', 'super', 'calm']
+
+
+def synthetic_comments(n, seed=0, min_words=2):
+    """Short Taglish recommendation feedback like the Node app collects."""
+    rnd = random.Random(seed)
+    return [' '.join(rnd.choice(COMMENT_WORDS) for _ in range(rnd.randint(min_words, 25))) for _ in range(n)]
+
+
+def anova_payload(logs):
+    """/api/run-anova body built the way the Node ANOVA controller builds it."""
+    data = {}
+    for log in logs:
+        if log.get('category') not in ACTIVITIES:
+            continue
+        before, after = log.get('beforeIntensity'), log.get('afterIntensity')
+        if before is None or after is None:
+            continue
+        score = math.floor((after - before) / 5 * 100 + 0.5)  # Math.round
+        data.setdefault(log['category'], {}).setdefault(log.get('activity') or 'unknown', []).append(score)
+    return {'data': data}
+
+
+def _signed(valence, intensity, scale):
+    if intensity is None:
+        return None
+    sign = {'positive': 1, 'negative': -1}.get(str(valence or '').lower(), 0)
+    return sign * intensity * scale
+
+
+def ccc_payload(logs, scale=20):
+    """/api/ccc/run body built the way the Node concordance controller builds it."""
+    data = {category: {} for category in ACTIVITIES}
+    for log in logs:
+        if log.get('category') == 'sleep':
+            continue
+        category = log.get('category') if log.get('category') in ACTIVITIES else 'activity'
+        pairs = data[category].setdefault(log.get('activity') or 'unknown', [])
+        b = _signed(log.get('beforeValence'), log.get('beforeIntensity'), scale)
+        a = _signed(log.get('afterValence'), log.get('afterIntensity'), scale)
+        if b is not None and a is not None:
+            pairs.append([b, a])
+    return {'data': data, 'thresholds': {'pos': 10, 'neg': -10, 'minPairs': 1, 'minCcc': 0.2, 'scale': scale}}
+
+
+COHORT_FIELDS = ['category', 'activity', 'beforeValence', 'beforeIntensity', 'afterValence', 'afterIntensity']
+
+
+def cohort_payload(logs, students):
+    """/api/cohort/analytics body: the logs as columns, dealt round-robin to `students` students."""
+    columns = {field: [log.get(field) for log in logs] for field in COHORT_FIELDS}
+    columns['student'] = [f'student-{i % students}' for i in range(len(logs))]
+    return {'columns': columns}
@@ -3,19 +3,42 @@ from flask_cors import CORS
 import logging
 import os
 
-from recommendation_sentiment import bp as sentiment_bp
-from prediction import bp as prediction_bp
-from concordance import ccc_bp
+import compression
+import metrics
+import profiling
+from json_provider import NumpyJSONProvider
+from readiness import bp as readiness_bp, lazy_import, preload, PRELOAD_MODELS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = NumpyJSONProvider(app)
 CORS(app)
-
-app.register_blueprint(sentiment_bp)
-app.register_blueprint(ccc_bp)
-app.register_blueprint(prediction_bp)
+metrics.init_app(app)
+compression.init_app(app)
+profiling.init_app(app)
+
+# (module, blueprint attribute). Modules are imported through lazy_import so
+# /ready can report per-module import time; their heavy dependencies are only
+# loaded on first use (or up front when PRELOAD_MODELS is set).
+BLUEPRINTS = [
+    ('recommendation_sentiment', 'bp'),
+    # Not mounted before lazy registration; it serves /api/run-anova, which
+    # the Node ANOVA controller (src/controllers/anovaController.js) calls
+    ('anova', 'bp'),
+    ('concordance', 'ccc_bp'),
+    ('prediction', 'bp'),
+    ('analytics', 'bp'),
+    ('cohort', 'bp'),
+]
+
+for module_name, attr in BLUEPRINTS:
+    app.register_blueprint(getattr(lazy_import(module_name), attr))
+app.register_blueprint(readiness_bp)
+
+if PRELOAD_MODELS:
+    preload()
 
 
 @app.route('/', methods=['GET'])
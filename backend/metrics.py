@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import Blueprint, Request, Response, g, has_request_context, request
+
+bp = Blueprint('metrics', __name__)
+
+# Adds a Server-Timing header with per-stage durations to every response.
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+_lock = threading.Lock()
+_requests = {}          # (blueprint, route, method, status) -> count
+_errors = {}            # (blueprint, route, method) -> count
+_request_latency = {}   # (blueprint, route, method) -> Histogram
+_stage_latency = {}     # stage -> Histogram
+_gauges = {}            # name -> (help, type, callback returning {labels: value})
+
+
+def observe_request(blueprint, route, method, status, seconds):
+    key = (blueprint, route, method)
+    with _lock:
+        status_key = key + (str(status),)
+        _requests[status_key] = _requests.get(status_key, 0) + 1
+        if status >= 500:
+            _errors[key] = _errors.get(key, 0) + 1
+        hist = _request_latency.get(key)
+        if hist is None:
+            hist = _request_latency[key] = Histogram()
+        hist.observe(seconds)
+
+
+def observe_stage(name, seconds):
+    with _lock:
+        hist = _stage_latency.get(name)
+        if hist is None:
+            hist = _stage_latency[name] = Histogram()
+        hist.observe(seconds)
+    if SERVER_TIMING and has_request_context():
+        timings = g.setdefault('stage_timings', {})
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    """Time a named stage of a hot path, e.g. `with stage('prediction.weekday_loop'):`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def register_gauge(name, help_text, callback, metric_type='gauge'):
+    """callback() returns {tuple of (label, value) pairs: number}, read at scrape time."""
+    with _lock:
+        _gauges[name] = (help_text, metric_type, callback)
+
+
+class TimedRequest(Request):
+    def get_json(self, *args, **kwargs):
+        with stage('request.json_decode'):
+            return super().get_json(*args, **kwargs)
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    observe_request(request.blueprint or 'app', rule, request.method, response.status_code, elapsed)
+    if SERVER_TIMING:
+        timings = g.get('stage_timings', {})
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items()]
+        parts.append(f'total;dur={elapsed * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(parts)
+    return response
+
+
+def init_app(app):
+    app.request_class = TimedRequest
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.register_blueprint(bp)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _histogram_lines(name, names, series):
+    lines = []
+    for values, hist in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, hist.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(names + ("le",), values + (bound,))} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(names + ("le",), values + ("+Inf",))} {hist.count}')
+        lines.append(f'{name}_sum{_labels(names, values)} {hist.total:.6f}')
+        lines.append(f'{name}_count{_labels(names, values)} {hist.count}')
+    return lines
+
+
+def render():
+    """Prometheus text exposition of this process's registry."""
+    with _lock:
+        requests_total = dict(_requests)
+        errors_total = dict(_errors)
+        request_latency = {k: _copy(h) for k, h in _request_latency.items()}
+        stage_latency = {(k,): _copy(h) for k, h in _stage_latency.items()}
+        gauges = dict(_gauges)
+
+    route_labels = ('blueprint', 'route', 'method')
+    lines = [
+        '# HELP mindful_http_requests_total Requests served, by route and status.',
+        '# TYPE mindful_http_requests_total counter',
+    ]
+    lines += [f'mindful_http_requests_total{_labels(route_labels + ("status",), k)} {v}'
+              for k, v in sorted(requests_total.items())]
+    lines += [
+        '# HELP mindful_http_request_errors_total Requests answered with a 5xx status.',
+        '# TYPE mindful_http_request_errors_total counter',
+    ]
+    lines += [f'mindful_http_request_errors_total{_labels(route_labels, k)} {v}'
+              for k, v in sorted(errors_total.items())]
+    lines += [
+        '# HELP mindful_http_request_duration_seconds Request latency by route.',
+        '# TYPE mindful_http_request_duration_seconds histogram',
+    ]
+    lines += _histogram_lines('mindful_http_request_duration_seconds', route_labels, request_latency)
+    lines += [
+        '# HELP mindful_stage_duration_seconds Time spent in named hot-path stages.',
+        '# TYPE mindful_stage_duration_seconds histogram',
+    ]
+    lines += _histogram_lines('mindful_stage_duration_seconds', ('stage',), stage_latency)
+
+    for name, (help_text, metric_type, callback) in sorted(gauges.items()):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+        for labels, value in sorted(callback().items()):
+            names = tuple(k for k, _ in labels)
+            values = tuple(v for _, v in labels)
+            lines.append(f'{name}{_labels(names, values)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _copy(hist):
+    clone = Histogram()
+    clone.counts = list(hist.counts)
+    clone.total = hist.total
+    clone.count = hist.count
+    return clone
+
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Per-process counters and histograms. Under gunicorn each worker keeps its
+    own registry, so scrape each worker (or sum across scrapes) accordingly.
+    """
+    return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,321 @@
+"""
+Trained-model prediction mode.
+
+With PREDICTION_MODE=model, per-category mood predictions come from a
+classifier trained offline across all users, instead of the weighted
+occurrence count in CategoryMoodPredictor. Each (user, category, weekday)
+is described by weekday, recency and recency-weighted emotion-frequency
+features over the same 4-week window the heuristic uses; the label is the
+most frequent emotion logged on that weekday in the following week.
+
+    python mood_model.py train export.json     # {"<userId>": [mood logs], ...}
+
+The model is saved uncompressed with joblib and loaded with mmap_mode='r',
+so every worker maps the same file pages instead of holding a private
+copy. HistGradientBoostingClassifier is used because its tree nodes are
+plain arrays that stay memory-mapped; RandomForest trees are copied into
+each process on load. Users, categories and weekdays the model cannot
+serve fall back to the heuristic.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+from metrics import stage
+from readiness import lazy_import, register_warmup
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_MODE = os.getenv('PREDICTION_MODE', 'heuristic')  # or 'model'
+MOOD_MODEL_PATH = os.getenv(
+    'MOOD_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'mood_model.joblib'))
+MODEL_FORMAT = 1
+
+CATEGORIES = ['activity', 'social', 'health', 'sleep']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+EMOTIONS = ['bored', 'sad', 'disappointed', 'angry', 'tense', 'calm', 'relaxed', 'pleased', 'happy', 'excited']
+WEEK_WEIGHTS = [1, 2, 3, 4]   # oldest to newest week of the window, as in CategoryMoodPredictor
+MIN_WINDOW_LOGS = 14
+CONFIDENCE_CAP = 90.0
+
+FEATURES = (
+    [f'weekday_{d.lower()}' for d in DAYS]
+    + [f'day_freq_{e}' for e in EMOTIONS]
+    + [f'category_freq_{e}' for e in EMOTIONS]
+    + ['weeks_since_logged', 'positive_share', 'log_count']
+)
+
+_lock = threading.Lock()
+_loaded = {'key': None, 'bundle': None}   # key is (path, mtime, size)
+
+
+def model_enabled():
+    return PREDICTION_MODE == 'model'
+
+
+def _week_index(ts):
+    # Whole weeks since Monday 1970-01-05, so every week starts on a Monday
+    pd = lazy_import('pandas')
+    return (ts.dt.floor('D') - pd.Timestamp('1970-01-05', tz='UTC')).dt.days // 7
+
+
+def mood_events(users):
+    """
+    (events, user ids): one row per log of every user with user index,
+    category, week, weekday, date, emotion and positive. None when the logs
+    lack the fields the features need.
+    """
+    pd = lazy_import('pandas')
+    ids = list(users)
+    rows = [log for user_id in ids for log in users[user_id]]
+    frame = pd.DataFrame(rows)
+    if frame.empty or not {'category', 'timestamp', 'afterEmotion', 'afterValence'} <= set(frame.columns):
+        return None
+    ts = pd.to_datetime(frame['timestamp'], utc=True, format='ISO8601')
+    emotion = frame['afterEmotion'].astype(str).str.strip().str.lower()
+    return pd.DataFrame({
+        'user': np.repeat(np.arange(len(ids)), [len(users[u]) for u in ids]),
+        'category': frame['category'],
+        'week': _week_index(ts),
+        'weekday': ts.dt.weekday,
+        'date': ts.dt.floor('D'),
+        'emotion': emotion.where(emotion.isin(EMOTIONS)),
+        'positive': frame['afterValence'].astype(str).str.strip().str.lower() == 'positive',
+    }), ids
+
+
+def _normalized(table, index, columns):
+    wide = table.unstack(columns, fill_value=0).reindex(columns=EMOTIONS, fill_value=0)
+    wide = wide.div(wide.sum(axis=1).replace(0, 1), axis=0)
+    wide.index = wide.index.set_names(index)
+    return wide
+
+
+def window_features(events, anchor=None):
+    """
+    Features for every (user, category, anchor week, weekday) with logs in
+    the 4 weeks before the anchor week, where the category has at least
+    MIN_WINDOW_LOGS logs in that window. `anchor=None` takes every week as
+    an anchor (training); an int restricts to that week (inference).
+    Returns (keys DataFrame, feature matrix).
+    """
+    pd = lazy_import('pandas')
+    lags = []
+    for lag in range(1, 5):
+        shifted = events if anchor is None else events[events['week'] == anchor - lag]
+        shifted = shifted.assign(anchor=shifted['week'] + lag, lag=lag, weight=WEEK_WEIGHTS[4 - lag])
+        lags.append(shifted)
+    window = pd.concat(lags, ignore_index=True)
+    group = ['user', 'category', 'anchor']
+
+    counts = window.groupby(group).size()
+    eligible = counts[counts >= MIN_WINDOW_LOGS].index
+    window = window.set_index(group).loc[lambda w: w.index.isin(eligible)].reset_index()
+    known = window[window['emotion'].notna()]
+
+    # Like the heuristic, an emotion counts once per day however often it was logged
+    daily = known.drop_duplicates(['user', 'category', 'date', 'emotion', 'anchor'])
+    day_freq = _normalized(
+        daily.groupby(group + ['weekday', 'emotion'])['weight'].sum(), group + ['weekday'], 'emotion')
+    category_freq = _normalized(daily.groupby(group + ['emotion'])['weight'].sum(), group, 'emotion')
+
+    weekday = known.groupby(group + ['weekday']).agg(
+        lag=('lag', 'min'), positive=('positive', 'mean'), logs=('positive', 'size'))
+    keys = day_freq.index.to_frame(index=False)
+    category_rows = category_freq.reindex(pd.MultiIndex.from_frame(keys[group])).to_numpy()
+    weekday = weekday.reindex(day_freq.index)
+    X = np.hstack([
+        np.eye(7)[keys['weekday'].to_numpy()],
+        day_freq.to_numpy(),
+        category_rows,
+        ((weekday['lag'].to_numpy() - 1) / 3.0)[:, None],
+        weekday['positive'].to_numpy(dtype=float)[:, None],
+        np.log1p(weekday['logs'].to_numpy(dtype=float))[:, None],
+    ])
+    return keys, X
+
+
+def weekday_labels(events):
+    """Most frequent known emotion per (user, category, week, weekday); ties go to the earlier EMOTIONS entry."""
+    known = events[events['emotion'].notna()]
+    counts = known.groupby(['user', 'category', 'week', 'weekday', 'emotion']).size().rename('n').reset_index()
+    counts['order'] = counts['emotion'].map(EMOTIONS.index)
+    counts = counts.sort_values(['n', 'order'], ascending=[False, True])
+    labels = counts.drop_duplicates(['user', 'category', 'week', 'weekday'])
+    return labels.rename(columns={'week': 'anchor'})[['user', 'category', 'anchor', 'weekday', 'emotion']]
+
+
+def train(users, min_samples=50, test_size=0.2, seed=0):
+    """
+    Fit one classifier per category on every user's history. Returns the
+    bundle to save and a report with hold-out accuracy next to the
+    heuristic's (arg-max of the weighted weekday frequencies).
+    """
+    ensemble = lazy_import('sklearn.ensemble')
+    model_selection = lazy_import('sklearn.model_selection')
+    prepared = mood_events(users)
+    if prepared is None:
+        raise ValueError('No usable mood logs (need category, timestamp, afterEmotion, afterValence)')
+    events, _ = prepared
+    keys, X = window_features(events)
+    labelled = keys.reset_index().merge(weekday_labels(events), on=['user', 'category', 'anchor', 'weekday'])
+
+    models, report = {}, {}
+    for category in CATEGORIES:
+        rows = labelled[labelled['category'] == category]
+        y = rows['emotion'].to_numpy()
+        if len(rows) < min_samples or len(set(y)) < 2:
+            report[category] = {'samples': len(rows), 'skipped': 'not enough samples or classes'}
+            continue
+        features = X[rows['index'].to_numpy()]
+        X_train, X_test, y_train, y_test = model_selection.train_test_split(
+            features, y, test_size=test_size, random_state=seed)
+        clf = ensemble.HistGradientBoostingClassifier(max_iter=100, max_leaf_nodes=15, random_state=seed)
+        clf.fit(X_train, y_train)
+        heuristic = np.array(EMOTIONS)[X_test[:, 7:17].argmax(axis=1)]
+        report[category] = {
+            'samples': len(rows),
+            'accuracy': round(float(clf.score(X_test, y_test)), 4),
+            'heuristicAccuracy': round(float(np.mean(heuristic == y_test)), 4),
+        }
+        models[category] = clf.fit(features, y)
+
+    bundle = {
+        'format': MODEL_FORMAT,
+        'trainedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'features': FEATURES,
+        'users': len(users),
+        'models': models,
+        'report': report,
+    }
+    return bundle, report
+
+
+def save_model(bundle, path=None):
+    """
+    Write uncompressed (mmap needs raw arrays) and swap in atomically, so
+    workers still mapping the old file keep a consistent copy until reload.
+    """
+    joblib = lazy_import('joblib')
+    path = path or MOOD_MODEL_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(bundle, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def load_model(path=None):
+    """The trained bundle, memory-mapped; None when missing or unreadable. Reloads when the file changes."""
+    path = path or MOOD_MODEL_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    if _loaded['key'] == key:
+        return _loaded['bundle']
+    with _lock:
+        if _loaded['key'] != key:
+            bundle = None
+            try:
+                with stage('prediction.model_load'):
+                    bundle = lazy_import('joblib').load(path, mmap_mode='r')
+                if not isinstance(bundle, dict) or bundle.get('format') != MODEL_FORMAT:
+                    logger.error(f"Ignoring mood model at {path}: unsupported format")
+                    bundle = None
+            except Exception as e:
+                logger.error(f"Failed to load mood model from {path}: {str(e)}")
+            _loaded['key'], _loaded['bundle'] = key, bundle
+    return _loaded['bundle']
+
+
+def _day_prediction(classes, probabilities):
+    """One weekday in CategoryMoodPredictor's day shape (prediction, confidence, emotion_breakdown)."""
+    by_emotion = dict(zip(classes, probabilities))
+    breakdown = {}
+    for emotion in EMOTIONS:
+        prob = round(min(float(by_emotion.get(emotion, 0.0)) * 100, CONFIDENCE_CAP), 1)
+        if prob > 0:
+            breakdown[emotion] = prob
+    best = int(np.argmax(probabilities))
+    return {
+        'prediction': str(classes[best]),
+        'confidence': round(min(float(probabilities[best]) * 100, CONFIDENCE_CAP), 1),
+        'emotion_breakdown': breakdown,
+    }
+
+
+NO_DATA = {'prediction': 'no data available', 'confidence': 0, 'emotion_breakdown': {}}
+
+
+def predict_users(users, path=None):
+    """
+    {user id: {category: {day: {prediction, confidence, emotion_breakdown}}}}
+    for the users and categories the model can serve, with one
+    predict_proba call per category covering every user and weekday. Empty
+    when model mode is off, the model is unavailable or the logs cannot be
+    featurized; callers fill the gaps with the heuristic.
+    """
+    if not model_enabled() or not users:
+        return {}
+    bundle = load_model(path)
+    if bundle is None:
+        return {}
+    pd = lazy_import('pandas')
+    try:
+        with stage('prediction.model_features'):
+            prepared = mood_events(users)
+            if prepared is None:
+                return {}
+            events, ids = prepared
+            current_week = int(_week_index(pd.Series([pd.Timestamp.now(tz='UTC')])).iloc[0])
+            keys, X = window_features(events, anchor=current_week)
+    except Exception as e:
+        logger.warning(f"Mood model features failed, using heuristic: {str(e)}")
+        return {}
+
+    results = {}
+    for category, clf in bundle['models'].items():
+        rows = np.flatnonzero(keys['category'].to_numpy() == category)
+        if not len(rows):
+            continue
+        with stage('prediction.model_predict_proba'):
+            probabilities = clf.predict_proba(X[rows])
+        for row, proba in zip(rows, probabilities):
+            user_id = ids[keys['user'].iat[row]]
+            days = results.setdefault(user_id, {}).setdefault(category, {day: dict(NO_DATA) for day in DAYS})
+            days[DAYS[keys['weekday'].iat[row]]] = _day_prediction(clf.classes_, proba)
+    return results
+
+
+def _warm_model():
+    if load_model() is None:
+        logger.warning(f"PREDICTION_MODE=model but no mood model at {MOOD_MODEL_PATH}; using the heuristic")
+
+
+if model_enabled():
+    register_warmup('mood_model', _warm_model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the per-category mood classifier.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    tp = sub.add_parser('train')
+    tp.add_argument('logs', help='JSON object mapping user id to that user\'s mood logs')
+    tp.add_argument('--out', default=MOOD_MODEL_PATH)
+    tp.add_argument('--min-samples', type=int, default=50)
+    tp.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.logs) as f:
+        users = json.load(f)
+    bundle, report = train(users, min_samples=args.min_samples, seed=args.seed)
+    print(json.dumps({'path': save_model(bundle, args.out), 'users': len(users), 'report': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,15 @@
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 from datetime import datetime, timedelta, time
-import pandas as pd
-import numpy as np
 import requests
 import logging
 import os
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from collections import defaultdict
+from time import perf_counter
+import mood_model
+from admission import BATCH, admission_control
+from etags import conditional_response, fingerprint
+from metrics import observe_stage, stage
+from readiness import lazy_import, register_warmup
 
 logger = logging.getLogger(__name__)
 
@@ -35,18 +36,31 @@ class CategoryMoodPredictor:
         current_monday = today - timedelta(days=current_day)
         return current_monday + timedelta(days=days_from_monday)
 
-    def prepare_category_data(self, mood_logs, category):
-        try:
+    def build_mood_frame(self, mood_logs):
+        """
+        Normalized DataFrame of a user's logs, newest first. Shared by every
+        category so callers predicting several categories can build it once.
+        """
+        pd = lazy_import('pandas')
+        with stage('prediction.dataframe_build'):
             df = pd.DataFrame(mood_logs)
             if df.empty:
-                return None, f"No mood logs data received", None
+                return df
             # No longer using afterIntensity
             if 'afterValence' in df.columns:
                 df['afterValence'] = df['afterValence'].astype(str)
             if 'afterEmotion' in df.columns:
                 df['afterEmotion'] = df['afterEmotion'].astype(str)
             df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp', ascending=False)
+            return df.sort_values('timestamp', ascending=False)
+
+    def prepare_category_data(self, mood_logs, category, df=None):
+        pd = lazy_import('pandas')
+        try:
+            if df is None:
+                df = self.build_mood_frame(mood_logs)
+            if df.empty:
+                return None, f"No mood logs data received", None
             category_df = df[df['category'] == category].copy()
             if category_df.empty:
                 return None, f"No data found for {category} category", None
@@ -86,6 +100,7 @@ class CategoryMoodPredictor:
                 'weeks_of_data': len(category_df['week_number'].unique())
             }
             day_predictions = {}
+            loop_started = perf_counter()
             for day in self.days_of_week:
                 day_data = category_df[category_df['timestamp'].dt.day_name() == day]
                 if day_data.empty:
@@ -207,21 +222,92 @@ class CategoryMoodPredictor:
                     'activity': safe_activity,
                     'date': formatted_date
                 }
+            observe_stage('prediction.weekday_loop', perf_counter() - loop_started)
             return day_predictions, None, date_range_info
         except Exception as e:
             logger.error(f"Error in prepare_category_data for {category}: {str(e)}")
             return None, f"Error processing data for {category}: {str(e)}", None
 
+    def screen_category_availability(self, mood_logs):
+        """
+        Answer only "would prepare_category_data succeed?" for every category:
+        one DataFrame build and one windowed count per category instead of the
+        full per-weekday pipeline. Returns {category: error message or None}
+        with the same messages prepare_category_data produces, or None when
+        the payload needs the full pipeline to reproduce its error exactly
+        (missing columns, unparseable or missing timestamps).
+        """
+        pd = lazy_import('pandas')
+        df = pd.DataFrame(mood_logs)
+        if df.empty:
+            return {category: "No mood logs data received" for category in self.categories}
+        if 'category' not in df.columns or 'timestamp' not in df.columns:
+            return None
+        timestamps = pd.to_datetime(df['timestamp'])
+        if timestamps.isna().any():
+            return None
+
+        tz = timestamps.dt.tz
+        current_date = pd.Timestamp.now(tz=tz).date()
+        current_week_monday = current_date - pd.Timedelta(days=current_date.weekday())
+        current_week_start = pd.Timestamp.combine(current_week_monday, time.min).tz_localize(tz)
+        four_weeks_ago = current_week_start - pd.Timedelta(days=28)
+        in_window = (timestamps >= four_weeks_ago) & (timestamps < current_week_start)
+
+        categories = df['category']
+        present = set(categories[categories.isin(self.categories)].unique())
+        window_counts = categories[in_window].value_counts()
+        missing_fields = [f for f in ['afterEmotion', 'afterValence'] if f not in df.columns]
+
+        errors = {}
+        for category in self.categories:
+            found = int(window_counts.get(category, 0))
+            if category not in present:
+                errors[category] = f"No data found for {category} category"
+            elif found < 14:
+                errors[category] = f"Insufficient data for {category}. Need at least 14 entries, found {found}"
+            elif missing_fields:
+                errors[category] = f"Missing required field '{missing_fields[0]}' in {category} data"
+            else:
+                errors[category] = None
+        return errors
+
     def check_category_data_availability(self, mood_logs):
+        errors = None
+        try:
+            with stage('prediction.availability_screen'):
+                errors = self.screen_category_availability(mood_logs)
+        except Exception as e:
+            logger.warning(f"Availability screen fell back to full pipeline: {str(e)}")
+        if errors is None:
+            errors = {
+                category: self.prepare_category_data(mood_logs, category)[1]
+                for category in self.categories
+            }
         available_categories = {}
         for category in self.categories:
-            category_data, error, date_range = self.prepare_category_data(mood_logs, category)
+            error = errors[category]
             available_categories[category] = {
-                'available': category_data is not None,
-                'message': error if category_data is None else 'Sufficient data available'
+                'available': error is None,
+                'message': error if error is not None else 'Sufficient data available'
             }
         return available_categories
 
+def _warm_prediction():
+    now = datetime.now()
+    last_monday = (now - timedelta(days=now.weekday() + 7)).replace(hour=12, minute=0, second=0, microsecond=0)
+    logs = [{
+        'category': 'activity',
+        'activity': 'walking',
+        'afterEmotion': 'happy' if i % 2 else 'calm',
+        'afterValence': 'positive',
+        'timestamp': (last_monday - timedelta(days=i)).isoformat()
+    } for i in range(21)]
+    CategoryMoodPredictor().prepare_category_data(logs, 'activity')
+
+
+register_warmup('prediction', _warm_prediction)
+
 def predict_category_moods(mood_logs, category):
     try:
         predictor = CategoryMoodPredictor()
@@ -241,47 +327,170 @@ def check_data_availability(mood_logs):
         logger.error(f"Error in check_data_availability: {str(e)}")
         return {'error': str(e)}
 
+def all_category_predictions(mood_logs, df=None, modelled=None):
+    """
+    Per-day predictions for every category, shaped for the Node bulk endpoints.
+    `modelled` maps categories to day predictions already made by the trained
+    model (see mood_model); the other categories use the heuristic.
+    """
+    predictor = CategoryMoodPredictor()
+    if modelled is None:
+        modelled = mood_model.predict_users({None: mood_logs}).get(None, {})
+    if df is None and len(modelled) < len(predictor.categories):
+        try:
+            df = predictor.build_mood_frame(mood_logs)
+        except Exception:
+            df = None  # let prepare_category_data report the error per category
+    all_predictions = {}
+
+    for category in predictor.categories:
+        if category in modelled:
+            predictions, error = modelled[category], None
+        else:
+            predictions, error, _ = predictor.prepare_category_data(mood_logs, category, df)
+
+        category_preds = {}
+        if error:
+            # If error, fill with empty data
+            for day in predictor.days_of_week:
+                category_preds[day] = {
+                    'predictedMood': 'no data available',  # lowercase
+                    'actualMood': None,
+                    'allMoodProbabilities': {}
+                }
+        else:
+            for day, pred_data in predictions.items():
+                category_preds[day] = {
+                    'predictedMood': pred_data['prediction'].lower() if pred_data['prediction'] else 'no data available',  # lowercase
+                    'actualMood': None,
+                    'allMoodProbabilities': pred_data['emotion_breakdown']  # Already has lowercase keys and proper values
+                }
+        all_predictions[category] = category_preds
+    return all_predictions
+
+def bulk_category_predictions(users):
+    """
+    all_category_predictions for many users at once: {user id: mood logs} ->
+    {user id: {category: {day: ...}}}. In model mode each category is one
+    predict_proba call over every user and weekday.
+    """
+    modelled = mood_model.predict_users(users)
+    return {
+        user_id: all_category_predictions(mood_logs, modelled=modelled.get(user_id, {}))
+        for user_id, mood_logs in users.items()
+    }
+
+def auth_error(token):
+    if not token or not token.startswith('Bearer '):
+        return {
+            'success': False,
+            'message': 'Authorization token required'
+        }, 401
+    return None
+
+def category_error(category):
+    if not category or category not in ['activity', 'social', 'health', 'sleep']:
+        return {
+            'success': False,
+            'message': 'Invalid category. Must be one of: activity, social, health, sleep'
+        }, 400
+    return None
+
+UPSTREAM_ERROR = {
+    'success': False,
+    'message': 'Failed to fetch mood logs from backend'
+}
+
+def mood_logs_request(token):
+    """URL and headers for the Node mood-log fetch, shared by the sync and async servers."""
+    return f"{NODE_API_URL}/api/mood-logs-category", {
+        'Authorization': token,
+        'Content-Type': 'application/json'
+    }
+
+def fetch_mood_logs_raw(token):
+    """The Node response body, or None if the Node API did not answer 200."""
+    url, headers = mood_logs_request(token)
+    logger.info(f"Connecting to Node API at: {url}")
+    with stage('prediction.upstream_fetch'):
+        response = requests.get(url, headers=headers)
+    if response.status_code != 200:
+        return None
+    return response.content
+
+def decode_mood_logs(raw):
+    with stage('prediction.upstream_json_decode'):
+        return current_app.json.loads(raw).get('logs', [])
+
+def fetch_mood_logs(token):
+    """Returns the user's logs, or None if the Node API did not answer 200."""
+    raw = fetch_mood_logs_raw(token)
+    return None if raw is None else decode_mood_logs(raw)
+
+def conditional_upstream(route, raw, build_body, *args):
+    """
+    Serve build_body(logs, *args) under an ETag over the Node payload, so
+    polls with unchanged logs in the same week skip decoding and computing.
+    """
+    def compute():
+        body, status = build_body(decode_mood_logs(raw), *args)
+        return jsonify(body), status
+    return conditional_response(route, fingerprint(route, *args, raw), compute)
+
+def category_prediction_body(mood_logs, category):
+    result = predict_category_moods(mood_logs, category)
+    if 'error' in result:
+        return {
+            'success': False,
+            'message': result['error']
+        }, 400
+    return {
+        'success': True,
+        'category': category,
+        'predictions': result['predictions'],
+        'date_range': result.get('date_range')
+    }, 200
+
+def category_availability_body(mood_logs):
+    availability = check_data_availability(mood_logs)
+    return {
+        'success': True,
+        'availability': availability
+    }, 200
+
+def debug_mood_body(mood_logs):
+    debug_info = {
+        'total_logs': len(mood_logs),
+        'sample_log': mood_logs[0] if mood_logs else None,
+        'data_types': {},
+        'unique_categories': [],
+        'unique_after_valences': [],
+        'sample_after_intensities': []
+    }
+    if mood_logs:
+        sample = mood_logs[0]
+        for key, value in sample.items():
+            debug_info['data_types'][key] = str(type(value))
+        debug_info['unique_categories'] = list(set(log.get('category') for log in mood_logs))
+        debug_info['unique_after_valences'] = list(set(log.get('afterValence') for log in mood_logs))
+        debug_info['sample_after_intensities'] = [log.get('afterIntensity') for log in mood_logs[:5]]
+    return {
+        'success': True,
+        'debug_info': debug_info
+    }, 200
+
 @bp.route('/api/predict-category-mood', methods=['GET'])
 def get_category_prediction():
     try:
         token = request.headers.get('Authorization')
         category = request.args.get('category')
-        if not token or not token.startswith('Bearer '):
-            return jsonify({
-                'success': False,
-                'message': 'Authorization token required'
-            }), 401
-        if not category or category not in ['activity', 'social', 'health', 'sleep']:
-            return jsonify({
-                'success': False,
-                'message': 'Invalid category. Must be one of: activity, social, health, sleep'
-            }), 400
-        logger.info(f"Connecting to Node API at: {NODE_API_URL}/api/mood-logs-category")
-        response = requests.get(
-            f"{NODE_API_URL}/api/mood-logs-category",
-            headers={
-                'Authorization': token,
-                'Content-Type': 'application/json'
-            }
-        )
-        if response.status_code != 200:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to fetch mood logs from backend'
-            }), 500
-        mood_logs = response.json().get('logs', [])
-        result = predict_category_moods(mood_logs, category)
-        if 'error' in result:
-            return jsonify({
-                'success': False,
-                'message': result['error']
-            }), 400
-        return jsonify({
-            'success': True,
-            'category': category,
-            'predictions': result['predictions'],
-            'date_range': result.get('date_range')
-        })
+        error = auth_error(token) or category_error(category)
+        if error:
+            return jsonify(error[0]), error[1]
+        raw = fetch_mood_logs_raw(token)
+        if raw is None:
+            return jsonify(UPSTREAM_ERROR), 500
+        return conditional_upstream('predict-category-mood', raw, category_prediction_body, category)
     except Exception as e:
         logger.error(f"API Error: {str(e)}")
         return jsonify({
@@ -293,30 +502,13 @@ def get_category_prediction():
 def check_category_data():
     try:
         token = request.headers.get('Authorization')
-        if not token or not token.startswith('Bearer '):
-            return jsonify({
-                'success': False,
-                'message': 'Authorization token required'
-            }), 401
-        logger.info(f"Connecting to Node API at: {NODE_API_URL}/api/mood-logs-category")
-        response = requests.get(
-            f"{NODE_API_URL}/api/mood-logs-category",
-            headers={
-                'Authorization': token,
-                'Content-Type': 'application/json'
-            }
-        )
-        if response.status_code != 200:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to fetch mood logs from backend'
-            }), 500
-        mood_logs = response.json().get('logs', [])
-        availability = check_data_availability(mood_logs)
-        return jsonify({
-            'success': True,
-            'availability': availability
-        })
+        error = auth_error(token)
+        if error:
+            return jsonify(error[0]), error[1]
+        raw = fetch_mood_logs_raw(token)
+        if raw is None:
+            return jsonify(UPSTREAM_ERROR), 500
+        return conditional_upstream('check-category-data', raw, category_availability_body)
     except Exception as e:
         logger.error(f"API Error: {str(e)}")
         return jsonify({
@@ -325,6 +517,7 @@ def check_category_data():
         }), 500
 
 @bp.route('/api/predict-mood-all-categories', methods=['POST'])
+@admission_control(BATCH, max_concurrent=1)
 def predict_mood_all_categories():
     try:
         data = request.get_json()
@@ -336,30 +529,8 @@ def predict_mood_all_categories():
                 'message': 'Mood logs are required'
             }), 400
             
-        predictor = CategoryMoodPredictor()
-        all_predictions = {}
-        
-        for category in predictor.categories:
-            predictions, error, _ = predictor.prepare_category_data(mood_logs, category)
-            
-            category_preds = {}
-            if error:
-                # If error, fill with empty data
-                for day in predictor.days_of_week:
-                    category_preds[day] = {
-                        'predictedMood': 'no data available',  # lowercase
-                        'actualMood': None,
-                        'allMoodProbabilities': {}
-                    }
-            else:
-                for day, pred_data in predictions.items():
-                    category_preds[day] = {
-                        'predictedMood': pred_data['prediction'].lower() if pred_data['prediction'] else 'no data available',  # lowercase
-                        'actualMood': None,
-                        'allMoodProbabilities': pred_data['emotion_breakdown']  # Already has lowercase keys and proper values
-                    }
-            all_predictions[category] = category_preds
-            
+        all_predictions = all_category_predictions(mood_logs)
+
         return jsonify({
             'success': True,
             'predictions': all_predictions
@@ -372,6 +543,35 @@ def predict_mood_all_categories():
             'error': str(e)
         }), 500
 
+@bp.route('/api/predict-mood-bulk', methods=['POST'])
+@admission_control(BATCH, max_concurrent=1)
+def predict_mood_bulk():
+    """
+    Body: { "users": { "<userId>": [ ...mood logs... ], ... } }
+    Returns the /api/predict-mood-all-categories predictions per user.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        users = data.get('users')
+        if not users or not isinstance(users, dict) or not all(isinstance(v, list) for v in users.values()):
+            return jsonify({
+                'success': False,
+                'message': 'users must map each user id to a list of mood logs'
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'mode': 'model' if mood_model.model_enabled() and mood_model.load_model() is not None else 'heuristic',
+            'predictions': bulk_category_predictions(users)
+        })
+    except Exception as e:
+        logger.error(f"Bulk API Error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'error': str(e)
+        }), 500
+
 @bp.route('/api/predict-mood', methods=['GET'])
 def get_prediction_from_node():
     try:
@@ -403,44 +603,14 @@ def get_prediction_from_node():
 def debug_mood_data():
     try:
         token = request.headers.get('Authorization')
-        if not token or not token.startswith('Bearer '):
-            return jsonify({
-                'success': False,
-                'message': 'Authorization token required'
-            }), 401
-        logger.info(f"Connecting to Node API at: {NODE_API_URL}/api/mood-logs-category")
-        response = requests.get(
-            f"{NODE_API_URL}/api/mood-logs-category",
-            headers={
-                'Authorization': token,
-                'Content-Type': 'application/json'
-            }
-        )
-        if response.status_code != 200:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to fetch mood logs from backend'
-            }), 500
-        mood_logs = response.json().get('logs', [])
-        debug_info = {
-            'total_logs': len(mood_logs),
-            'sample_log': mood_logs[0] if mood_logs else None,
-            'data_types': {},
-            'unique_categories': [],
-            'unique_after_valences': [],
-            'sample_after_intensities': []
-        }
-        if mood_logs:
-            sample = mood_logs[0]
-            for key, value in sample.items():
-                debug_info['data_types'][key] = str(type(value))
-            debug_info['unique_categories'] = list(set(log.get('category') for log in mood_logs))
-            debug_info['unique_after_valences'] = list(set(log.get('afterValence') for log in mood_logs))
-            debug_info['sample_after_intensities'] = [log.get('afterIntensity') for log in mood_logs[:5]]
-        return jsonify({
-            'success': True,
-            'debug_info': debug_info
-        })
+        error = auth_error(token)
+        if error:
+            return jsonify(error[0]), error[1]
+        mood_logs = fetch_mood_logs(token)
+        if mood_logs is None:
+            return jsonify(UPSTREAM_ERROR), 500
+        body, status = debug_mood_body(mood_logs)
+        return jsonify(body), status
     except Exception as e:
         logger.error(f"Debug API Error: {str(e)}")
         return jsonify({
@@ -0,0 +1,268 @@
+"""
+Opt-in per-request sampling profiler.
+
+Nothing is registered unless PROFILING is set. A request is then profiled
+when it carries `X-Profile-Token: $PROFILE_TOKEN`, or at random with
+probability PROFILE_SAMPLE_RATE. While the request runs, a helper thread
+samples its call stack every PROFILE_INTERVAL_MS and the result is written
+to PROFILE_DIR as speedscope JSON (open at https://www.speedscope.app) or
+collapsed stacks (flamegraph.pl / inferno), named after the route and
+payload size. Only the newest PROFILE_MAX_FILES profiles are kept.
+
+With PROFILE_CAPTURE_BODY the request body is saved next to the profile so
+a slow payload can be replayed offline, profiled, against a local checkout:
+
+    python profiling.py replay profiles/<id>.request.json --repeat 5
+"""
+import argparse
+import base64
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILING = os.getenv('PROFILING', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 2))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))
+PROFILE_FORMAT = os.getenv('PROFILE_FORMAT', 'speedscope')  # or 'collapsed'
+PROFILE_CAPTURE_BODY = os.getenv('PROFILE_CAPTURE_BODY', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_EXCLUDE = ('/metrics', '/ready', '/health')
+
+_write_lock = threading.Lock()
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack until stop() is called."""
+
+    def __init__(self, target_ident, interval=PROFILE_INTERVAL_MS / 1000.0):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.samples = {}   # tuple of frame keys, outermost first -> seconds
+        self.started = None
+        self.elapsed = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.started = last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            key = tuple(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0.0) + (now - last)
+            last = now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return self
+
+
+def _frame_label(frame):
+    name, filename, line = frame
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def to_collapsed(samples):
+    # Weights are integer microseconds; flamegraph tools expect integer counts
+    lines = [
+        ';'.join(_frame_label(f) for f in stack) + f' {max(1, round(seconds * 1e6))}'
+        for stack, seconds in sorted(samples.items())
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def to_speedscope(samples, name, elapsed):
+    frames, index = [], {}
+    profile_samples, weights = [], []
+    for stack, seconds in samples.items():
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+            ids.append(index[frame])
+        profile_samples.append(ids)
+        weights.append(round(seconds * 1000, 3))
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'mindful-map profiling',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(max(elapsed * 1000, sum(weights)), 3),
+            'samples': profile_samples,
+            'weights': weights,
+        }],
+    }
+
+
+def _slug(route):
+    return re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+
+
+def _write_private(path, data):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+
+_SUFFIXES = ('.speedscope.json', '.collapsed.txt', '.request.json')
+
+
+def _rotate(directory, keep):
+    ids = sorted({name.split('.', 1)[0] for name in os.listdir(directory) if name.endswith(_SUFFIXES)})
+    for stale in ids[:max(0, len(ids) - keep)]:
+        for suffix in _SUFFIXES:
+            path = os.path.join(directory, stale + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def write_profile(sampler, route, payload_bytes, status=None, capture=None, directory=None, fmt=None):
+    """Write one profile (and optional request capture); returns its id."""
+    directory = directory or PROFILE_DIR
+    fmt = fmt or PROFILE_FORMAT
+    # Sortable id: time first so rotation drops the oldest
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}{int(time.time() * 1e6) % 1000000:06d}-{_slug(route)}-{payload_bytes}b-{os.getpid()}"
+    name = f'{route} ({payload_bytes} bytes, status {status}, {sampler.elapsed * 1000:.1f} ms)'
+    if fmt == 'collapsed':
+        filename, data = f'{profile_id}.collapsed.txt', to_collapsed(sampler.samples).encode()
+    else:
+        filename, data = f'{profile_id}.speedscope.json', json.dumps(to_speedscope(sampler.samples, name, sampler.elapsed)).encode()
+    with _write_lock:
+        os.makedirs(directory, exist_ok=True)
+        _write_private(os.path.join(directory, filename), data)
+        if capture is not None:
+            _write_private(os.path.join(directory, f'{profile_id}.request.json'), json.dumps(capture).encode())
+        _rotate(directory, PROFILE_MAX_FILES)
+    return profile_id
+
+
+def _capture_request():
+    body = request.get_data(cache=True)
+    try:
+        encoded, encoding = body.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        encoded, encoding = base64.b64encode(body).decode(), 'base64'
+    # Authorization and other headers are deliberately not stored
+    return {
+        'method': request.method,
+        'path': request.path,
+        'query': request.query_string.decode('latin-1'),
+        'contentType': request.content_type,
+        'body': encoded,
+        'bodyEncoding': encoding,
+    }
+
+
+def _should_profile():
+    if request.path.startswith(PROFILE_EXCLUDE):
+        return False
+    token = request.headers.get(PROFILE_HEADER)
+    if PROFILE_TOKEN and token and hmac.compare_digest(token, PROFILE_TOKEN):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _before_request():
+    if not _should_profile():
+        return
+    g.profile_capture = _capture_request() if PROFILE_CAPTURE_BODY else None
+    g.profile_sampler = StackSampler(threading.get_ident())
+    g.profile_sampler.start()
+
+
+def _after_request(response):
+    sampler = g.pop('profile_sampler', None)
+    if sampler is None:
+        return response
+    sampler.stop()
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    try:
+        profile_id = write_profile(sampler, route, request.content_length or 0, response.status_code,
+                                   g.pop('profile_capture', None))
+        response.headers['X-Profile-Id'] = profile_id
+    except OSError as e:
+        logger.error(f"Failed to write profile for {route}: {str(e)}")
+    return response
+
+
+def _teardown_request(exc):
+    # after_request is skipped when a response could not be produced
+    sampler = g.pop('profile_sampler', None)
+    if sampler is not None:
+        sampler.stop()
+
+
+def init_app(app):
+    """Register the profiling hooks; a no-op unless PROFILING is set."""
+    if not PROFILING:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    logger.info(f"Request profiling enabled (sample rate {PROFILE_SAMPLE_RATE}, "
+                f"token {'set' if PROFILE_TOKEN else 'unset'}) -> {PROFILE_DIR}")
+
+
+def replay(capture_path, repeat=1, directory=None, fmt=None):
+    """Re-run a captured request in-process under the profiler."""
+    from main import app
+
+    with open(capture_path) as f:
+        capture = json.load(f)
+    body = capture['body'].encode() if capture['bodyEncoding'] == 'utf-8' else base64.b64decode(capture['body'])
+    client = app.test_client()
+    ids = []
+    for _ in range(repeat):
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        response = client.open(capture['path'], method=capture['method'], query_string=capture['query'],
+                               data=body, content_type=capture['contentType'])
+        sampler.stop()
+        ids.append(write_profile(sampler, capture['path'], len(body), response.status_code,
+                                 directory=directory, fmt=fmt))
+        print(f"{response.status_code} in {sampler.elapsed * 1000:.1f} ms -> {ids[-1]}")
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay captured requests under the profiler.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    rp = sub.add_parser('replay')
+    rp.add_argument('capture', help='a <id>.request.json file written with PROFILE_CAPTURE_BODY')
+    rp.add_argument('--repeat', type=int, default=1)
+    rp.add_argument('--dir', default=None, help=f'output directory (default {PROFILE_DIR})')
+    rp.add_argument('--format', choices=['speedscope', 'collapsed'], default=None)
+    args = parser.parse_args()
+    replay(args.capture, args.repeat, args.dir, args.format)
+
+
+if __name__ == '__main__':
+    main()
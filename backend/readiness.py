@@ -0,0 +1,106 @@
+import gc
+import importlib
+import logging
+import os
+import threading
+import time
+from flask import Blueprint, request, jsonify
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('readiness', __name__)
+
+# Opt-in: warm every scorer and statistics path at app import. Combine with
+# `gunicorn --preload main:app` so the warm pages are shared copy-on-write.
+PRELOAD_MODELS = os.getenv('PRELOAD_MODELS', 'false').lower() in ('1', 'true', 'yes')
+
+_lock = threading.RLock()
+_modules = {}
+_import_times = {}   # module name -> seconds spent importing it
+_warmups = {}        # name -> callable
+_warm_state = {}     # name -> {'warm', 'seconds', 'error'}
+
+
+def lazy_import(name):
+    """
+    Import a module on first use and record how long it took.
+    Heavy dependencies (pandas, scipy, statsmodels, TextBlob, VADER) go
+    through here so worker boot stays cheap and /ready can report the cost.
+    """
+    module = _modules.get(name)
+    if module is None:
+        with _lock:
+            module = _modules.get(name)
+            if module is None:
+                start = time.perf_counter()
+                module = importlib.import_module(name)
+                _import_times[name] = time.perf_counter() - start
+                _modules[name] = module
+    return module
+
+
+def register_warmup(name, fn):
+    """Register a callable that loads and exercises one scorer or statistics path."""
+    with _lock:
+        _warmups[name] = fn
+        _warm_state.setdefault(name, {'warm': False, 'seconds': None, 'error': None})
+
+
+def warm_all():
+    """Run every registered warm-up once; failures are reported, not raised."""
+    with _lock:
+        pending = [(n, fn) for n, fn in _warmups.items() if not _warm_state[n]['warm']]
+    for name, fn in pending:
+        start = time.perf_counter()
+        try:
+            fn()
+            state = {'warm': True, 'seconds': round(time.perf_counter() - start, 3), 'error': None}
+        except Exception as e:
+            logger.error(f"Warm-up failed for {name}: {str(e)}")
+            state = {'warm': False, 'seconds': round(time.perf_counter() - start, 3), 'error': str(e)}
+        with _lock:
+            _warm_state[name] = state
+    return is_warm()
+
+
+def is_warm():
+    with _lock:
+        return all(s['warm'] for s in _warm_state.values())
+
+
+def preload():
+    """Warm everything and freeze the heap so forked workers share it copy-on-write."""
+    start = time.perf_counter()
+    warm_all()
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded models in {time.perf_counter() - start:.2f}s")
+
+
+@bp.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness probe. Reports warm state per scorer and an import-time breakdown.
+    With PRELOAD_MODELS enabled, returns 503 until everything is warm.
+    `?warm=1` warms this worker before answering.
+    """
+    if request.args.get('warm', '').lower() in ('1', 'true', 'yes'):
+        warm_all()
+
+    with _lock:
+        warm = {k: dict(v) for k, v in _warm_state.items()}
+        imports = dict(_import_times)
+    all_warm = all(s['warm'] for s in warm.values())
+    is_ready = all_warm or not PRELOAD_MODELS
+
+    return jsonify({
+        'ready': is_ready,
+        'warm': all_warm,
+        'preload': PRELOAD_MODELS,
+        'pid': os.getpid(),
+        'scorers': warm,
+        'importMs': {
+            k: round(v * 1000, 1)
+            for k, v in sorted(imports.items(), key=lambda kv: kv[1], reverse=True)
+        }
+    }), 200 if is_ready else 503
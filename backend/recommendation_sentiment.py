@@ -1,18 +1,44 @@
+from abc import ABC, abstractmethod
 from flask import Blueprint, request, jsonify
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import math
+import os
 import re
 import logging
+import sqlite3
+import threading
+import time
+import uuid
+from compression import compression_options
+from admission import BATCH, INTERACTIVE, admission_control
+from metrics import observe_stage
+from readiness import lazy_import, register_warmup
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('recommendation_sentiment', __name__)
 
-analyzer = SentimentIntensityAnalyzer()
+_analyzer = None
+_analyzer_lock = threading.Lock()
 
 MIN_COMMENT_LENGTH = 10
 
+# Offline scoring jobs (see /api/sentiment/jobs)
+SENTIMENT_JOB_DB = os.getenv(
+    'SENTIMENT_JOB_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_jobs.sqlite3'))
+SENTIMENT_JOB_WORKERS = int(os.getenv('SENTIMENT_JOB_WORKERS', 2))        # concurrent jobs per process
+SENTIMENT_JOB_MAX_ACTIVE = int(os.getenv('SENTIMENT_JOB_MAX_ACTIVE', 20))  # queued + running, all processes
+SENTIMENT_JOB_MAX_ITEMS = int(os.getenv('SENTIMENT_JOB_MAX_ITEMS', 200000))
+SENTIMENT_JOB_CHUNK_SIZE = int(os.getenv('SENTIMENT_JOB_CHUNK_SIZE', 200))
+SENTIMENT_JOB_STALE_SECONDS = float(os.getenv('SENTIMENT_JOB_STALE_SECONDS', 120))
+SENTIMENT_JOB_POLL_SECONDS = float(os.getenv('SENTIMENT_JOB_POLL_SECONDS', 1.0))
+SENTIMENT_JOB_PAGE_SIZE = 500
+
 
 def normalize_filipino_shortcuts(text: str) -> str:
   t = f" {str(text)} ".lower()
@@ -49,6 +75,16 @@ def normalize_filipino_shortcuts(text: str) -> str:
   return " ".join(t.split())
 
 
+def get_analyzer():
+  """VADER analyzer, built on first use (loads its lexicon from disk)."""
+  global _analyzer
+  if _analyzer is None:
+    with _analyzer_lock:
+      if _analyzer is None:
+        _analyzer = lazy_import('vaderSentiment.vaderSentiment').SentimentIntensityAnalyzer()
+  return _analyzer
+
+
 def clean_text(text: str) -> str:
   """
   Clean and preprocess text for sentiment analysis.
@@ -59,27 +95,173 @@ def clean_text(text: str) -> str:
   return txt
 
 
-def get_sentiment_score(text: str):
+class SentimentScorer(ABC):
   """
-  Get sentiment using TextBlob and VADER, combined like the web service:
-  - VADER compound (70%) + TextBlob polarity (30%)
-  - Clipped to [-1, 1]
-  - Thresholds at 0.05 / -0.05 for sentiment label
+  Base class for registered scorers; a subclass without score_batch cannot
+  be instantiated, so it fails where it is registered.
+  score_batch(texts) receives already-cleaned texts and returns, in order,
+  one {'score': float in [-1, 1], 'details': dict} per text. 'details' is
+  what /api/sentiment reports under scores[<name>] in debug mode.
   """
-  try:
-    clean_text_input = clean_text(text)
+  name = None
+
+  @abstractmethod
+  def score_batch(self, texts):
+    """One {'score', 'details'} dict per cleaned text, in order."""
+
+
+SCORERS = {}
+
+
+def register_scorer(scorer):
+  if not isinstance(scorer, SentimentScorer) or not scorer.name:
+    raise TypeError(f"Sentiment scorers must be named SentimentScorer instances, got {scorer!r}")
+  SCORERS[scorer.name] = scorer
+  return scorer
+
 
-    # TextBlob analysis
-    blob = TextBlob(clean_text_input)
-    textblob_polarity = float(blob.sentiment.polarity)         # [-1, 1]
-    textblob_subjectivity = float(blob.sentiment.subjectivity) # [0, 1]
+class TextBlobScorer(SentimentScorer):
+  name = 'textblob'
 
-    # VADER analysis
-    vader_scores = analyzer.polarity_scores(clean_text_input)  # compound in [-1, 1]
-    vader_compound = float(vader_scores['compound'])
+  def score_batch(self, texts):
+    TextBlob = lazy_import('textblob').TextBlob
+    out = []
+    for t in texts:
+      s = TextBlob(t).sentiment
+      polarity = float(s.polarity)          # [-1, 1]
+      subjectivity = float(s.subjectivity)  # [0, 1]
+      out.append({'score': polarity, 'details': {'polarity': polarity, 'subjectivity': subjectivity}})
+    return out
 
-    # Combine scores (VADER weighted more, per Hutto & Gilbert 2014)
-    combined_score = 0.7 * vader_compound + 0.3 * textblob_polarity
+
+class VaderScorer(SentimentScorer):
+  name = 'vader'
+
+  def score_batch(self, texts):
+    analyzer = get_analyzer()
+    out = []
+    for t in texts:
+      scores = analyzer.polarity_scores(t)  # compound in [-1, 1]
+      out.append({'score': float(scores['compound']), 'details': scores})
+    return out
+
+
+class LexiconScorer(SentimentScorer):
+  """
+  Vectorized baseline: sums VADER lexicon valences over a sparse
+  (texts x vocabulary) token-count matrix in one product, then normalizes
+  like VADER's compound score. No negation, booster or punctuation rules,
+  so it is much cheaper per text and noticeably cruder.
+  """
+  name = 'lexicon'
+  ALPHA = 15.0
+  TOKEN_RE = re.compile(r"[a-z][a-z']*")
+
+  def __init__(self):
+    self._vocab = None
+    self._valences = None
+    self._lock = threading.Lock()
+
+  def _load(self):
+    if self._vocab is None:
+      with self._lock:
+        if self._vocab is None:
+          np = lazy_import('numpy')
+          lexicon = get_analyzer().lexicon
+          self._valences = np.fromiter(lexicon.values(), dtype=float, count=len(lexicon))
+          self._vocab = {word: i for i, word in enumerate(lexicon)}
+    return self._vocab, self._valences
+
+  def score_batch(self, texts):
+    np = lazy_import('numpy')
+    sparse = lazy_import('scipy.sparse')
+    vocab, valences = self._load()
+
+    rows, cols = [], []
+    for i, t in enumerate(texts):
+      for token in self.TOKEN_RE.findall(t.lower()):
+        j = vocab.get(token)
+        if j is not None:
+          rows.append(i)
+          cols.append(j)
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(len(texts), len(valences)))
+
+    raw = counts @ valences
+    hits = np.asarray(counts.sum(axis=1)).ravel()
+    compound = raw / np.sqrt(raw * raw + self.ALPHA)
+    return [
+        {'score': float(c), 'details': {'compound': round(float(c), 4), 'matchedTokens': int(h)}}
+        for c, h in zip(compound, hits)
+    ]
+
+
+register_scorer(TextBlobScorer())
+register_scorer(VaderScorer())
+register_scorer(LexiconScorer())
+
+
+DEFAULT_SCORER_WEIGHTS = 'vader=0.7,textblob=0.3'
+
+
+def _parse_scorer_weights(spec):
+  """
+  {scorer: weight} from "name=weight" pairs. Unknown scorers are skipped; a
+  malformed or negative weight, or no positive weight at all, falls back to
+  DEFAULT_SCORER_WEIGHTS so a bad setting cannot stop the app from booting.
+  """
+  weights = {}
+  for part in spec.split(','):
+    name, _, weight = part.partition('=')
+    if not name.strip():
+      continue
+    if name.strip() not in SCORERS:
+      logger.warning(f"Ignoring weight for unknown sentiment scorer '{name.strip()}'")
+      continue
+    try:
+      value = float(weight)
+    except ValueError:
+      value = None
+    if value is None or not math.isfinite(value) or value < 0:
+      logger.warning(f"Invalid sentiment scorer weight '{part.strip()}'; using '{DEFAULT_SCORER_WEIGHTS}'")
+      return _parse_scorer_weights(DEFAULT_SCORER_WEIGHTS)
+    weights[name.strip()] = value
+  if not any(weights.values()):
+    logger.warning(f"No positive sentiment scorer weight in '{spec}'; using '{DEFAULT_SCORER_WEIGHTS}'")
+    return _parse_scorer_weights(DEFAULT_SCORER_WEIGHTS)
+  return weights
+
+
+# "name=weight" pairs; scorers with weight 0 (or not listed) are not run.
+# The default reproduces the web service: VADER 70% + TextBlob 30%.
+SENTIMENT_SCORER_WEIGHTS = _parse_scorer_weights(
+    os.getenv('SENTIMENT_SCORER_WEIGHTS', DEFAULT_SCORER_WEIGHTS))
+
+
+def score_batch(texts, timings=None):
+  """
+  Score raw texts through every weighted scorer, one score_batch call each.
+  Returns one get_sentiment_score-shaped result per text. When `timings` is
+  a dict it is filled with per-scorer wall time in milliseconds.
+  """
+  cleaned = [clean_text(t) for t in texts]
+  active = [(SCORERS[n], w) for n, w in SENTIMENT_SCORER_WEIGHTS.items() if w]
+  total_weight = sum(w for _, w in active)
+  if not active or total_weight == 0:
+    raise ValueError('No sentiment scorer has a non-zero weight')
+
+  per_scorer = {}
+  for scorer, _ in active:
+    start = time.perf_counter()
+    per_scorer[scorer.name] = scorer.score_batch(cleaned)
+    elapsed = time.perf_counter() - start
+    observe_stage(f'sentiment.{scorer.name}', elapsed)
+    if timings is not None:
+      timings[scorer.name] = round(elapsed * 1000, 3)
+
+  results = []
+  for i in range(len(cleaned)):
+    combined_score = sum(w * per_scorer[scorer.name][i]['score'] for scorer, w in active) / total_weight
 
     # Clip to [-1, 1]
     combined_score = max(-1.0, min(1.0, combined_score))
@@ -92,28 +274,82 @@ def get_sentiment_score(text: str):
     else:
       sentiment = 'neutral'
 
-    return {
+    scores = {name: out[i]['details'] for name, out in per_scorer.items()}
+    scores['combined'] = combined_score
+    results.append({
         'sentiment': sentiment,
         'confidence': abs(combined_score),
-        'scores': {
-            'textblob': {
-                'polarity': textblob_polarity,
-                'subjectivity': textblob_subjectivity
-            },
-            'vader': vader_scores,
-            'combined': combined_score
-        }
-    }
+        'scores': scores
+    })
+  return results
+
+
+def get_sentiment_score(text: str):
+  """
+  Get sentiment for one text through the scorer registry. With the default
+  weights this is combined like the web service:
+  - VADER compound (70%) + TextBlob polarity (30%)
+  - Clipped to [-1, 1]
+  - Thresholds at 0.05 / -0.05 for sentiment label
+  """
+  try:
+    return score_batch([text])[0]
   except Exception as e:
     logger.error(f"Error in sentiment analysis: {str(e)}")
     raise
 
 
+def _warm_sentiment():
+  # TextBlob loads its pattern lexicon lazily on the first .sentiment call.
+  for scorer in SCORERS.values():
+    scorer.score_batch(['warming up the sentiment scorers, salamat po'])
+
+
+register_warmup('sentiment', _warm_sentiment)
+
+
 def effective_hint(score: float) -> str:
   return 'positive' if score > 0.25 else ('negative' if score < -0.25 else 'neutral')
 
 
+def _too_short(c):
+  return not c or len(str(c).strip()) < MIN_COMMENT_LENGTH
+
+
+def score_comments(comments, timings=None):
+  """
+  Score comments into the result shape used by the batch endpoint. Comments
+  shorter than MIN_COMMENT_LENGTH are skipped with sentimentUsed=false; the
+  rest go through the scorers as a single batch.
+  """
+  eligible = [i for i, c in enumerate(comments) if not _too_short(c)]
+  scored = score_batch([str(comments[i]) for i in eligible], timings) if eligible else []
+
+  results = [{
+      'comment': c,
+      'sentimentScore': 0.0,
+      'sentimentUsed': False,
+      'effectiveHint': 'neutral',
+      'error': 'comment_too_short'
+  } for c in comments]
+  for i, r in zip(eligible, scored):
+    score = float(r['scores']['combined'])
+    results[i] = {
+        'comment': comments[i],
+        'sentimentScore': score,
+        'sentimentUsed': True,
+        'effectiveHint': effective_hint(score)
+    }
+  return results
+
+
+def score_comment(c):
+  return score_comments([c])[0]
+
+
 @bp.route('/api/sentiment', methods=['POST'])
+@admission_control(INTERACTIVE)
+@compression_options(enabled=False)
 def api_sentiment():
   """
   Endpoint compatible with Node: returns sentimentScore and sentimentUsed.
@@ -137,7 +373,8 @@ def api_sentiment():
         resp['normalizedText'] = clean_text(comment)
       return jsonify(resp), 200
 
-    result = get_sentiment_score(comment)
+    timings = {} if debug else None
+    result = score_batch([comment], timings)[0]
     sentiment_score = float(result['scores']['combined'])
 
     resp = {
@@ -152,6 +389,8 @@ def api_sentiment():
       resp['scores'] = result['scores']
       resp['sentiment'] = result['sentiment']
       resp['confidence'] = round(result['confidence'], 3)
+      resp['weights'] = SENTIMENT_SCORER_WEIGHTS
+      resp['timingsMs'] = timings
 
     return jsonify(resp), 200
   except Exception as e:
@@ -160,41 +399,513 @@ def api_sentiment():
 
 
 @bp.route('/api/sentiment/batch', methods=['POST'])
+@admission_control(BATCH)
 def api_sentiment_batch():
   """
   Batch endpoint analogous to the web batch-analyze route,
   but returning only the fields needed by the Node backend.
+  All eligible comments are scored in one pass per scorer.
   """
   try:
     body = request.get_json(silent=True) or {}
     comments = body.get('comments', [])
+    debug = bool(body.get('debug', False))
     if not isinstance(comments, list):
       return jsonify({'success': False, 'error': 'comments must be an array'}), 400
 
-    results = []
-    for c in comments:
-      if not c or len(str(c).strip()) < MIN_COMMENT_LENGTH:
-        results.append({
-            'comment': c,
-            'sentimentScore': 0.0,
-            'sentimentUsed': False,
-            'effectiveHint': 'neutral',
-            'error': 'comment_too_short'
-        })
+    timings = {} if debug else None
+    results = score_comments(comments, timings)
+
+    resp = {'success': True, 'results': results}
+    if debug:
+      resp['weights'] = SENTIMENT_SCORER_WEIGHTS
+      resp['timingsMs'] = timings
+    return jsonify(resp), 200
+  except Exception as e:
+    logger.error(f"/api/sentiment/batch error: {str(e)}")
+    return jsonify({'success': False, 'error': str(e)}), 500
+
+
+class SentimentJobQueueFull(Exception):
+  pass
+
+
+class SentimentJobStore:
+  """
+  SQLite-backed store for offline scoring jobs, shared by every worker process
+  on the host. Each item keeps its result as soon as it is scored, so a job
+  interrupted by a worker restart resumes from the first unscored item.
+  """
+
+  SCHEMA = """
+  CREATE TABLE IF NOT EXISTS sentiment_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+  );
+  CREATE INDEX IF NOT EXISTS idx_sentiment_jobs_status ON sentiment_jobs (status, created_at);
+  CREATE TABLE IF NOT EXISTS sentiment_job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    item_id TEXT,
+    comment TEXT,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+  );
+  """
+
+  def __init__(self, path):
+    self.path = path
+    self._schema_lock = threading.Lock()
+    self._schema_ready = False
+
+  def exists(self):
+    return os.path.exists(self.path)
+
+  def _connect(self):
+    conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if not self._schema_ready:
+      with self._schema_lock:
+        if not self._schema_ready:
+          conn.execute('PRAGMA journal_mode=WAL')
+          conn.executescript(self.SCHEMA)
+          self._schema_ready = True
+    return conn
+
+  @contextmanager
+  def _transaction(self, immediate=False):
+    conn = self._connect()
+    try:
+      conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+      yield conn
+      conn.execute('COMMIT')
+    except Exception:
+      if conn.in_transaction:
+        conn.execute('ROLLBACK')
+      raise
+    finally:
+      conn.close()
+
+  def create(self, items, max_active):
+    """items: list of (item_id, comment). Raises SentimentJobQueueFull."""
+    job_id = uuid.uuid4().hex
+    with self._transaction(immediate=True) as conn:
+      active = conn.execute(
+          "SELECT COUNT(*) FROM sentiment_jobs WHERE status IN ('queued', 'running')"
+      ).fetchone()[0]
+      if active >= max_active:
+        raise SentimentJobQueueFull(f"{active} jobs already queued or running")
+      conn.execute(
+          "INSERT INTO sentiment_jobs (id, status, total, created_at) VALUES (?, 'queued', ?, ?)",
+          (job_id, len(items), time.time()))
+      conn.executemany(
+          "INSERT INTO sentiment_job_items (job_id, idx, item_id, comment) VALUES (?, ?, ?, ?)",
+          ((job_id, i, json.dumps(item_id), json.dumps(comment))
+           for i, (item_id, comment) in enumerate(items)))
+    return job_id
+
+  def get(self, job_id):
+    conn = self._connect()
+    try:
+      row = conn.execute("SELECT * FROM sentiment_jobs WHERE id = ?", (job_id,)).fetchone()
+      return dict(row) if row else None
+    finally:
+      conn.close()
+
+  def claim(self, owner, stale_after):
+    """Claim the oldest queued job, or a running job whose owner stopped heartbeating."""
+    now = time.time()
+    with self._transaction(immediate=True) as conn:
+      row = conn.execute(
+          "SELECT id FROM sentiment_jobs "
+          "WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?) "
+          "ORDER BY created_at LIMIT 1",
+          (now - stale_after,)).fetchone()
+      if row is None:
+        return None
+      conn.execute(
+          "UPDATE sentiment_jobs SET status = 'running', owner = ?, heartbeat_at = ?, "
+          "started_at = COALESCE(started_at, ?) WHERE id = ?",
+          (owner, now, now, row['id']))
+      return row['id']
+
+  def checkpoint(self, job_id, owner):
+    """Refresh the heartbeat. Returns 'ok', 'cancel' or 'lost' (claimed elsewhere)."""
+    with self._transaction(immediate=True) as conn:
+      row = conn.execute(
+          "SELECT owner, cancel_requested FROM sentiment_jobs WHERE id = ?", (job_id,)).fetchone()
+      if row is None or row['owner'] != owner:
+        return 'lost'
+      conn.execute("UPDATE sentiment_jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+      return 'cancel' if row['cancel_requested'] else 'ok'
+
+  def pending_items(self, job_id, limit):
+    conn = self._connect()
+    try:
+      rows = conn.execute(
+          "SELECT idx, item_id, comment FROM sentiment_job_items "
+          "WHERE job_id = ? AND result IS NULL ORDER BY idx LIMIT ?",
+          (job_id, limit)).fetchall()
+      return [(r['idx'], json.loads(r['item_id']), json.loads(r['comment'])) for r in rows]
+    finally:
+      conn.close()
+
+  def save_results(self, job_id, owner, rows, failed):
+    """rows: list of (idx, result dict). Returns False if the job was claimed elsewhere."""
+    with self._transaction(immediate=True) as conn:
+      row = conn.execute("SELECT owner FROM sentiment_jobs WHERE id = ?", (job_id,)).fetchone()
+      if row is None or row['owner'] != owner:
+        return False
+      conn.executemany(
+          "UPDATE sentiment_job_items SET result = ? WHERE job_id = ? AND idx = ? AND result IS NULL",
+          ((json.dumps(result), job_id, idx) for idx, result in rows))
+      conn.execute(
+          "UPDATE sentiment_jobs SET processed = processed + ?, failed = failed + ?, heartbeat_at = ? "
+          "WHERE id = ?",
+          (len(rows), failed, time.time(), job_id))
+      return True
+
+  def finish(self, job_id, owner, status, error=None):
+    with self._transaction(immediate=True) as conn:
+      conn.execute(
+          "UPDATE sentiment_jobs SET status = ?, error = ?, finished_at = ? "
+          "WHERE id = ? AND owner = ? AND status = 'running'",
+          (status, error, time.time(), job_id, owner))
+
+  def request_cancel(self, job_id):
+    """Queued jobs are cancelled immediately; running jobs stop at the next chunk."""
+    with self._transaction(immediate=True) as conn:
+      row = conn.execute("SELECT status FROM sentiment_jobs WHERE id = ?", (job_id,)).fetchone()
+      if row is None:
+        return None
+      if row['status'] == 'queued':
+        conn.execute(
+            "UPDATE sentiment_jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+            "WHERE id = ?",
+            (time.time(), job_id))
+        return 'cancelled'
+      if row['status'] == 'running':
+        conn.execute("UPDATE sentiment_jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+      return row['status']
+
+  def results(self, job_id, offset, limit):
+    conn = self._connect()
+    try:
+      rows = conn.execute(
+          "SELECT idx, result FROM sentiment_job_items "
+          "WHERE job_id = ? AND idx >= ? AND result IS NOT NULL ORDER BY idx LIMIT ?",
+          (job_id, offset, limit)).fetchall()
+      return [(r['idx'], json.loads(r['result'])) for r in rows]
+    finally:
+      conn.close()
+
+  def counts_by_status(self):
+    conn = self._connect()
+    try:
+      rows = conn.execute("SELECT status, COUNT(*) AS n FROM sentiment_jobs GROUP BY status").fetchall()
+      return {r['status']: r['n'] for r in rows}
+    finally:
+      conn.close()
+
+
+class SentimentJobRunner:
+  """
+  Per-process worker pool draining the shared job store. Started lazily in
+  each worker process (never before a fork) and polls the store for queued or
+  orphaned jobs, running at most `workers` jobs at a time.
+  """
+
+  def __init__(self, store, workers):
+    self.store = store
+    self.workers = workers
+    self.owner = None
+    self._pid = None
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._slots = None
+    self._pool = None
+    self._counters = {}
+
+  def ensure_started(self, create=False):
+    pid = os.getpid()
+    if self._pid == pid or self.workers <= 0:
+      return
+    if not create and not self.store.exists():
+      return
+    with self._lock:
+      if self._pid == pid:
+        return
+      self.owner = f"{pid}:{uuid.uuid4().hex[:8]}"
+      self._slots = threading.BoundedSemaphore(self.workers)
+      self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sentiment-job')
+      self._counters = {
+          'jobs_started': 0,
+          'jobs_completed': 0,
+          'jobs_failed': 0,
+          'jobs_cancelled': 0,
+          'items_scored': 0,
+          'items_failed': 0,
+          'busy_seconds': 0.0,
+      }
+      threading.Thread(target=self._dispatch_loop, name='sentiment-job-dispatcher', daemon=True).start()
+      self._pid = pid
+
+  def notify(self):
+    self._wake.set()
+
+  def _count(self, **deltas):
+    with self._lock:
+      for k, v in deltas.items():
+        self._counters[k] += v
+
+  def stats(self):
+    with self._lock:
+      counters = dict(self._counters)
+    busy = counters.get('busy_seconds', 0.0)
+    counters['busy_seconds'] = round(busy, 3)
+    counters['items_per_second'] = round(counters.get('items_scored', 0) / busy, 2) if busy > 0 else 0.0
+    return counters
+
+  def _dispatch_loop(self):
+    while True:
+      self._slots.acquire()
+      job_id = None
+      try:
+        job_id = self.store.claim(self.owner, SENTIMENT_JOB_STALE_SECONDS)
+      except Exception as e:
+        logger.error(f"Sentiment job claim failed: {str(e)}")
+      if job_id is None:
+        self._slots.release()
+        self._wake.wait(SENTIMENT_JOB_POLL_SECONDS)
+        self._wake.clear()
         continue
+      self._pool.submit(self._run_job, job_id)
+
+  def _run_job(self, job_id):
+    started = time.perf_counter()
+    self._count(jobs_started=1)
+    try:
+      while True:
+        state = self.store.checkpoint(job_id, self.owner)
+        if state == 'lost':
+          logger.warning(f"Sentiment job {job_id} was claimed by another worker")
+          return
+        if state == 'cancel':
+          self.store.finish(job_id, self.owner, 'cancelled')
+          self._count(jobs_cancelled=1)
+          return
+
+        items = self.store.pending_items(job_id, SENTIMENT_JOB_CHUNK_SIZE)
+        if not items:
+          self.store.finish(job_id, self.owner, 'completed')
+          self._count(jobs_completed=1)
+          return
+
+        rows, failed = [], 0
+        comments = [comment for _, _, comment in items]
+        try:
+          results = score_comments(comments)
+        except Exception:
+          # Fall back to one at a time so a single bad item doesn't sink the chunk
+          results = []
+          for (idx, _, comment) in items:
+            try:
+              results.append(score_comment(comment))
+            except Exception as e:
+              logger.error(f"Sentiment job {job_id} item {idx} failed: {str(e)}")
+              failed += 1
+              results.append({
+                  'comment': comment,
+                  'sentimentScore': 0.0,
+                  'sentimentUsed': False,
+                  'effectiveHint': 'neutral',
+                  'error': 'scoring_failed'
+              })
+        for (idx, item_id, _), result in zip(items, results):
+          if item_id is not None:
+            result['id'] = item_id
+          rows.append((idx, result))
+
+        if not self.store.save_results(job_id, self.owner, rows, failed):
+          logger.warning(f"Sentiment job {job_id} was claimed by another worker")
+          return
+        self._count(items_scored=len(rows), items_failed=failed)
+    except Exception as e:
+      logger.error(f"Sentiment job {job_id} failed: {str(e)}")
+      try:
+        self.store.finish(job_id, self.owner, 'failed', str(e))
+      except Exception:
+        pass
+      self._count(jobs_failed=1)
+    finally:
+      self._count(busy_seconds=time.perf_counter() - started)
+      self._slots.release()
+      self._wake.set()
+
+
+job_store = SentimentJobStore(SENTIMENT_JOB_DB)
+job_runner = SentimentJobRunner(job_store, SENTIMENT_JOB_WORKERS)
+
+
+def _iso(ts):
+  return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+def _job_status(job):
+  total = job['total']
+  processed = job['processed']
+  elapsed = 0.0
+  if job['started_at']:
+    elapsed = (job['finished_at'] or time.time()) - job['started_at']
+  return {
+      'jobId': job['id'],
+      'status': job['status'],
+      'total': total,
+      'processed': processed,
+      'failed': job['failed'],
+      'progress': round(processed / total, 4) if total else 1.0,
+      'itemsPerSecond': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+      'cancelRequested': bool(job['cancel_requested']),
+      'error': job['error'],
+      'createdAt': _iso(job['created_at']),
+      'startedAt': _iso(job['started_at']),
+      'finishedAt': _iso(job['finished_at'])
+  }
+
+
+@bp.before_app_request
+def _resume_sentiment_jobs():
+  # Cheap after the first call per process; picks up jobs orphaned by a restart.
+  job_runner.ensure_started()
+
+
+@bp.route('/api/sentiment/jobs', methods=['POST'])
+def api_sentiment_job_submit():
+  """
+  Queue comments for offline scoring.
+  Body: { "comments": ["text", ...] } or { "comments": [{"id": ..., "comment": "text"}, ...] }
+  Poll /api/sentiment/jobs/<jobId> for progress and page through
+  /api/sentiment/jobs/<jobId>/results once items are scored.
+  """
+  try:
+    body = request.get_json(silent=True) or {}
+    comments = body.get('comments', [])
+    if not isinstance(comments, list):
+      return jsonify({'success': False, 'error': 'comments must be an array'}), 400
+    if len(comments) > SENTIMENT_JOB_MAX_ITEMS:
+      return jsonify({
+          'success': False,
+          'error': f'too many comments (max {SENTIMENT_JOB_MAX_ITEMS})'
+      }), 413
+
+    items = []
+    for c in comments:
+      if isinstance(c, dict):
+        items.append((c.get('id'), c.get('comment', '')))
+      else:
+        items.append((None, c))
+
+    job_runner.ensure_started(create=True)
+    try:
+      job_id = job_store.create(items, SENTIMENT_JOB_MAX_ACTIVE)
+    except SentimentJobQueueFull as e:
+      logger.warning(f"/api/sentiment/jobs rejected: {str(e)}")
+      resp = jsonify({'success': False, 'error': 'job_queue_full'})
+      resp.headers['Retry-After'] = '30'
+      return resp, 429
+    job_runner.notify()
+
+    return jsonify({'success': True, 'jobId': job_id, 'status': 'queued', 'total': len(items)}), 202
+  except Exception as e:
+    logger.error(f"/api/sentiment/jobs error: {str(e)}")
+    return jsonify({'success': False, 'error': str(e)}), 500
 
-      r = get_sentiment_score(c)
-      score = float(r['scores']['combined'])
-      results.append({
-          'comment': c,
-          'sentimentScore': score,
-          'sentimentUsed': True,
-          'effectiveHint': effective_hint(score)
-      })
 
-    return jsonify({'success': True, 'results': results}), 200
+@bp.route('/api/sentiment/jobs/stats', methods=['GET'])
+def api_sentiment_job_stats():
+  """Job counts across the store plus this process's throughput counters."""
+  try:
+    return jsonify({
+        'success': True,
+        'jobs': job_store.counts_by_status() if job_store.exists() else {},
+        'worker': {'pid': os.getpid(), 'poolSize': SENTIMENT_JOB_WORKERS, **job_runner.stats()}
+    }), 200
   except Exception as e:
-    logger.error(f"/api/sentiment/batch error: {str(e)}")
+    logger.error(f"/api/sentiment/jobs/stats error: {str(e)}")
+    return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/api/sentiment/jobs/<job_id>', methods=['GET'])
+def api_sentiment_job_status(job_id):
+  try:
+    job = job_store.get(job_id) if job_store.exists() else None
+    if job is None:
+      return jsonify({'success': False, 'error': 'job_not_found'}), 404
+    return jsonify({'success': True, **_job_status(job)}), 200
+  except Exception as e:
+    logger.error(f"/api/sentiment/jobs/{job_id} error: {str(e)}")
+    return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/api/sentiment/jobs/<job_id>/results', methods=['GET'])
+@compression_options(gzip_level=1, zstd_level=1)
+def api_sentiment_job_results(job_id):
+  """
+  Paged results in submission order: ?offset=0&limit=500.
+  Only scored items are returned; nextOffset is null once the job is done
+  and the last page has been read.
+  """
+  try:
+    job = job_store.get(job_id) if job_store.exists() else None
+    if job is None:
+      return jsonify({'success': False, 'error': 'job_not_found'}), 404
+    try:
+      offset = max(0, int(request.args.get('offset', 0)))
+      limit = min(SENTIMENT_JOB_PAGE_SIZE, max(1, int(request.args.get('limit', SENTIMENT_JOB_PAGE_SIZE))))
+    except ValueError:
+      return jsonify({'success': False, 'error': 'offset and limit must be integers'}), 400
+
+    rows = job_store.results(job_id, offset, limit)
+    if rows:
+      next_offset = rows[-1][0] + 1
+    else:
+      next_offset = offset
+    if next_offset >= job['total'] or (not rows and job['status'] in ('completed', 'failed', 'cancelled')):
+      next_offset = None
+
+    return jsonify({
+        'success': True,
+        'jobId': job_id,
+        'status': job['status'],
+        'total': job['total'],
+        'offset': offset,
+        'nextOffset': next_offset,
+        'results': [r for _, r in rows]
+    }), 200
+  except Exception as e:
+    logger.error(f"/api/sentiment/jobs/{job_id}/results error: {str(e)}")
+    return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/api/sentiment/jobs/<job_id>/cancel', methods=['POST'])
+def api_sentiment_job_cancel(job_id):
+  try:
+    status = job_store.request_cancel(job_id) if job_store.exists() else None
+    if status is None:
+      return jsonify({'success': False, 'error': 'job_not_found'}), 404
+    return jsonify({'success': True, 'jobId': job_id, 'status': status}), 200
+  except Exception as e:
+    logger.error(f"/api/sentiment/jobs/{job_id}/cancel error: {str(e)}")
     return jsonify({'success': False, 'error': str(e)}), 500
 
 